@@ -1,5 +1,7 @@
 import os
 import json
+import threading
+from contextlib import asynccontextmanager
 from datetime import datetime
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Body, Query, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
@@ -13,6 +15,8 @@ from services.parsing_service import ParsingService
 import logging
 from enum import Enum
 from utils.config import VectorDBProvider
+from utils.vector_files import vector_sidecar_path
+from utils.model_utils import cuda_available, warmup_cuda
 import pandas as pd
 from pathlib import Path
 from services.generation_service import GenerationService
@@ -23,7 +27,15 @@ from typing import List, Dict, Optional
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 有 CUDA 时在后台线程中初始化 CUDA 上下文，不阻塞服务启动，首个查询无需再承担初始化开销；
+    # cuda_available() 在没有 NVIDIA 驱动的主机上不会导入 torch
+    if cuda_available():
+        threading.Thread(target=warmup_cuda, daemon=True).start()
+    yield
+
+app = FastAPI(lifespan=lifespan)
 
 # 确保必要的目录存在
 os.makedirs("temp", exist_ok=True)
@@ -255,7 +267,12 @@ async def index_embeddings(data: dict):
         if not os.path.exists(embedding_file):
             raise FileNotFoundError(f"Embedding file not found: {file_id}")
             
-        config = VectorDBConfig(provider=vector_db, index_mode=index_mode)
+        config = VectorDBConfig(
+            provider=vector_db,
+            index_mode=index_mode,
+            overwrite=bool(data.get("overwrite", False)),
+            skip_if_exists=bool(data.get("skipIfExists", False))
+        )
         vector_store_service = VectorStoreService()
         result = vector_store_service.index_embeddings(embedding_file, config)
         
@@ -303,7 +320,8 @@ async def search(
     collection_id: str = Body(...),
     top_k: int = Body(3),
     threshold: float = Body(0.7),
-    word_count_threshold: int = Body(100)
+    word_count_threshold: int = Body(100),
+    profile: Optional[str] = Body(None)
 ):
     """执行向量搜索"""
     try:
@@ -320,7 +338,8 @@ async def search(
             collection_id=collection_id,
             top_k=top_k,
             threshold=threshold,
-            word_count_threshold=word_count_threshold
+            word_count_threshold=word_count_threshold,
+            profile=profile
         )
         
         # Log the search results
@@ -543,6 +562,9 @@ async def delete_embedded_doc(doc_name: str):
             )
             
         os.remove(file_path)
+        sidecar_path = vector_sidecar_path(file_path)
+        if os.path.exists(sidecar_path):
+            os.remove(sidecar_path)
         return {"message": f"Document {doc_name} deleted successfully"}
     except Exception as e:
         logger.error(f"Error deleting embedded document {doc_name}: {str(e)}")
@@ -753,14 +775,11 @@ async def evaluate_search(
         # 读取CSV文件
         df = pd.read_csv(file.file)
         
-        # 只合并前四列的文本内容
-        df['combined_text'] = df.apply(
-            lambda row: ' '.join(
-                str(val) for i, val in enumerate(row) 
-                if i < 4 and pd.notna(val) and val != '[]'
-            ), 
-            axis=1
-        )
+        # 只合并前四列的文本内容（按元组遍历，不为每行构造 Series）
+        df['combined_text'] = [
+            ' '.join(str(val) for val in values if pd.notna(val) and val != '[]')
+            for values in df.iloc[:, :4].itertuples(index=False, name=None)
+        ]
         
         # 初始化SearchService
         search_service = SearchService()
@@ -771,14 +790,14 @@ async def evaluate_search(
         valid_queries = 0
         
         # 处理每个查询
-        for _, row in df.iterrows():
+        for label, combined_text in zip(df['LABEL'], df['combined_text']):
             # 跳过没有标签的行
-            if pd.isna(row['LABEL']) or row['LABEL'] == '[]':
+            if pd.isna(label) or label == '[]':
                 continue
                 
             try:
                 # 解析标签页码列表
-                label_str = str(row['LABEL']).strip('[]').replace(' ', '')
+                label_str = str(label).strip('[]').replace(' ', '')
                 if label_str:
                     expected_pages = [int(x.strip()) for x in label_str.split(',') if x.strip()]
                 else:
@@ -786,10 +805,11 @@ async def evaluate_search(
                 
                 # 执行搜索
                 search_results = await search_service.search(
-                    query=row['combined_text'],
+                    query=combined_text,
                     collection_id=collection_id,
                     top_k=top_k,
-                    threshold=threshold
+                    threshold=threshold,
+                    profile="recall"
                 )
                 
                 # 提取找到的页码
@@ -802,7 +822,7 @@ async def evaluate_search(
                 
                 # 添加到结果列表，包括所有top_k结果的文本
                 result_entry = {
-                    "query": row['combined_text'],
+                    "query": combined_text,
                     "expected_pages": expected_pages,
                     "found_pages": found_pages,
                     "score_hit": score_hit,
@@ -986,8 +1006,29 @@ async def explain_financial_term(
         service = FinancialStandardizationService()
         return StreamingResponse(
             service.search_and_explain_stream(text, api_key=api_key),
-            media_type="text/event-stream"
+            media_type="text/event-stream",
+            # 关闭 nginx 等反向代理的响应缓冲，使每个 token 到达后立即转发
+            headers={"X-Accel-Buffering": "no", "Cache-Control": "no-cache"}
         )
     except Exception as e:
         logger.error(f"Error explaining financial term: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/financial/standardize")
+def standardize_financial_entities(
+    text: str = Body(...),
+    entity_types: Optional[List[str]] = Body(None),
+    api_key: Optional[str] = Body(None)
+):
+    """
+    识别并标准化文本中的金融实体（单次 LLM 调用）
+    
+    LLM、嵌入与 Milvus 调用均为阻塞调用，声明为普通函数由 FastAPI 放入线程池执行，不阻塞事件循环
+    """
+    try:
+        service = FinancialStandardizationService()
+        entities = service.recognize_and_standardize(text, entity_types=entity_types, api_key=api_key)
+        return {"entities": entities}
+    except Exception as e:
+        logger.error(f"Error standardizing financial entities: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,14 +1,156 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
+from functools import lru_cache
 import logging
+import multiprocessing
+import os
+import numpy as np
 from langchain_text_splitters import (
     RecursiveCharacterTextSplitter,
-    MarkdownHeaderTextSplitter,
-    CharacterTextSplitter,
-    TokenTextSplitter
+    MarkdownHeaderTextSplitter
 )
+import tiktoken
+
+try:
+    # 可选依赖：Rust 实现的递归分块器，未安装时回退到 LangChain
+    from semantic_text_splitter import TextSplitter as RustTextSplitter
+except ImportError:
+    RustTextSplitter = None
 
 logger = logging.getLogger(__name__)
 
+# 纯 Python 分块器只有在页数达到该值时才使用进程池，小文档不值得付出进程启动开销
+PROCESS_POOL_MIN_PAGES = 32
+
+
+@lru_cache(maxsize=1)
+def _get_process_pool() -> ProcessPoolExecutor:
+    """
+    进程内共享的长期进程池，首次使用时创建，避免每个请求都重新启动工作进程
+    
+    使用 spawn 启动方式：uvicorn 工作进程是多线程的（还可能有 CUDA 预热线程和 CUDA 上下文），
+    fork 会复制其他线程持有的锁，可能导致子进程死锁
+    """
+    return ProcessPoolExecutor(
+        max_workers=os.cpu_count() or 1,
+        mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(encoding_name: str):
+    """缓存 tiktoken 编码器句柄，BPE 词表在进程内只加载一次"""
+    return tiktoken.get_encoding(encoding_name)
+
+
+class PageMap:
+    """
+    页面映射的列式（SoA）表示
+    
+    texts 为各页文本，numbers 为对应页码（ndarray，可直接用于 _lookup_pages 的向量化反查）
+    """
+    def __init__(self, texts: list, numbers):
+        self.texts = texts
+        self.numbers = np.asarray(numbers)
+
+    @classmethod
+    def from_dicts(cls, page_map: list) -> "PageMap":
+        """由 [{"text": ..., "page": ...}, ...] 形式的页面映射构造"""
+        return cls([page_data['text'] for page_data in page_map], [page_data['page'] for page_data in page_map])
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def page_numbers(self) -> list:
+        """以 Python 标量返回页码列表，便于直接写入 JSON"""
+        return self.numbers.tolist()
+
+
+def _lookup_pages(ends: np.ndarray, numbers: np.ndarray, positions):
+    """ends 为各页结束位置（不含），返回 positions 所在页的页码（Python 标量）"""
+    return numbers[np.searchsorted(ends, positions, side="right")].tolist()
+
+
+class RustRecursiveSplitter:
+    """
+    semantic-text-splitter 的适配器，对外提供与 LangChain 一致的 split_text 接口
+    
+    递归下降（字符遍历与分隔符匹配）在 Rust 中完成，按字符数计算块大小
+    """
+    releases_gil = True
+
+    def __init__(self, chunk_size: int, chunk_overlap: int):
+        self._splitter = RustTextSplitter(capacity=chunk_size, overlap=chunk_overlap)
+
+    def split_text(self, text: str) -> list:
+        return self._splitter.chunks(text)
+
+
+class SpaceSeparatorSplitter:
+    """
+    按单个空格切分并贪心合并的分块器，结果与 CharacterTextSplitter(separator=" ") 一致
+    
+    切词直接使用 str.split(" ")（C 实现），合并时用 deque 维护当前窗口及各词长度，
+    弹出窗口头部的重叠部分为 O(1)，不再像 LangChain 那样反复切片列表
+    """
+    def __init__(self, chunk_size: int, chunk_overlap: int):
+        if chunk_overlap > chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) must not be larger than chunk_size ({chunk_size})")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def split_text(self, text: str) -> list:
+        chunk_size = self.chunk_size
+        chunk_overlap = self.chunk_overlap
+        docs = []
+        current = deque()
+        total = 0
+        for word in text.split(" "):
+            if not word:
+                continue
+            length = len(word)
+            if current and total + length + 1 > chunk_size:
+                if total > chunk_size:
+                    logger.warning(f"Created a chunk of size {total}, which is longer than the specified {chunk_size}")
+                doc = " ".join(current).strip()
+                if doc:
+                    docs.append(doc)
+                # 保留不超过 chunk_overlap 的尾部作为下一块的重叠，并保证放得下当前词
+                while total > chunk_overlap or (total > 0 and total + length + 1 > chunk_size):
+                    total -= len(current.popleft()) + (1 if current else 0)
+            total += length + (1 if current else 0)
+            current.append(word)
+        doc = " ".join(current).strip()
+        if doc:
+            docs.append(doc)
+        return docs
+
+
+class TokenWindowSplitter:
+    """
+    按 Token 窗口切分 token id 序列
+    
+    直接在 token id 上按 chunk_size 切窗口、以 chunk_size - chunk_overlap 为步长滑动，
+    再把每个窗口解码回文本，不需要反复对文本重新编码
+    """
+    def __init__(self, chunk_size: int, chunk_overlap: int, encoding_name: str = "gpt2"):
+        if chunk_overlap >= chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size})")
+        self.chunk_size = chunk_size
+        self.stride = chunk_size - chunk_overlap
+        self.encoding = _get_encoding(encoding_name)
+
+    def window_bounds(self, n_tokens: int):
+        """生成 [start, end) 形式的窗口边界"""
+        for start in range(0, n_tokens, self.stride):
+            end = min(start + self.chunk_size, n_tokens)
+            yield start, end
+            if end >= n_tokens:
+                break
+
+
 class ChunkingService:
     """
     文本分块服务，提供多种文本分块策略
@@ -22,6 +164,13 @@ class ChunkingService:
     - markdown: 按 Markdown 标题分块
     - token: 按 Token 数量分块
     """
+    # Markdown 标题分块器只保存配置、不保存切分状态，可在所有调用间共享；
+    # LangChain 在切分时会跳过 ``` / ~~~ 代码块中的行，代码注释中的 # 不会被当作标题
+    _MD_SPLITTER = MarkdownHeaderTextSplitter(headers_to_split_on=[
+        ("#", "Header 1"),
+        ("##", "Header 2"),
+        ("###", "Header 3"),
+    ])
     
     def chunk_text(self, text: str, method: str, metadata: dict, page_map: list = None, chunk_size: int = 1000, chunk_overlap: int = 200) -> dict:
         """
@@ -44,6 +193,8 @@ class ChunkingService:
             
             chunks = []
             total_pages = len(page_map) if page_map else 0
+            if page_map and not isinstance(page_map, PageMap):
+                page_map = PageMap.from_dicts(page_map)
             
             if method == "by_pages":
                 chunks = self._chunk_by_pages(page_map)
@@ -88,68 +239,121 @@ class ChunkingService:
             logger.error(f"Error in chunk_text: {str(e)}")
             raise
 
-    def _chunk_by_pages(self, page_map: list) -> list:
+    def _chunk_by_pages(self, page_map: PageMap) -> list:
         chunks = []
-        for page_data in page_map:
+        for text, page in zip(page_map.texts, page_map.page_numbers()):
             chunks.append({
-                "content": page_data['text'],
+                "content": text,
                 "metadata": {
                     "chunk_id": len(chunks) + 1,
-                    "page_number": page_data['page'],
-                    "page_range": str(page_data['page']),
-                    "word_count": len(page_data['text'].split())
+                    "page_number": page,
+                    "page_range": str(page),
+                    "word_count": len(text.split())
                 }
             })
         return chunks
 
-    def _chunk_fixed_size(self, page_map: list, chunk_size: int, chunk_overlap: int) -> list:
-        splitter = CharacterTextSplitter(
-            separator=" ",
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-        )
+    def _chunk_fixed_size(self, page_map: PageMap, chunk_size: int, chunk_overlap: int) -> list:
+        splitter = SpaceSeparatorSplitter(chunk_size, chunk_overlap)
         return self._apply_splitter(page_map, splitter)
 
-    def _chunk_by_separator(self, page_map: list, separator: str) -> list:
+    def _chunk_by_separator(self, page_map: PageMap, separator: str) -> list:
         chunks = []
-        for page_data in page_map:
-            paras = [p.strip() for p in page_data['text'].split(separator) if p.strip()]
-            for para in paras:
+        chunk_id = 0
+        for page_text, page in zip(page_map.texts, page_map.page_numbers()):
+            for para in page_text.split(separator):
+                para = para.strip()
+                if not para:
+                    continue
+                chunk_id += 1
                 chunks.append({
                     "content": para,
                     "metadata": {
-                        "chunk_id": len(chunks) + 1,
-                        "page_number": page_data['page'],
-                        "page_range": str(page_data['page']),
+                        "chunk_id": chunk_id,
+                        "page_number": page,
+                        "page_range": str(page),
                         "word_count": len(para.split())
                     }
                 })
         return chunks
 
-    def _chunk_recursive(self, page_map: list, chunk_size: int, chunk_overlap: int, separators: list = None) -> list:
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            separators=separators or ["\n\n", "\n", " ", ""]
-        )
+    def _chunk_recursive(self, page_map: PageMap, chunk_size: int, chunk_overlap: int, separators: list = None) -> list:
+        splitter = self._get_recursive_splitter(chunk_size, chunk_overlap, tuple(separators) if separators else None)
         return self._apply_splitter(page_map, splitter)
 
-    def _chunk_token(self, page_map: list, chunk_size: int, chunk_overlap: int) -> list:
-        splitter = TokenTextSplitter(
+    @staticmethod
+    @lru_cache(maxsize=8)
+    def _get_recursive_splitter(chunk_size: int, chunk_overlap: int, separators: tuple = None):
+        """
+        按参数缓存递归分块器
+        
+        默认分隔符时优先使用 Rust 实现；自定义分隔符（如按句子分块）
+        或未安装 semantic-text-splitter 时使用 LangChain 的 RecursiveCharacterTextSplitter
+        """
+        if separators is None and RustTextSplitter is not None:
+            return RustRecursiveSplitter(chunk_size, chunk_overlap)
+        return RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap
+            chunk_overlap=chunk_overlap,
+            separators=list(separators) if separators else ["\n\n", "\n", " ", ""]
         )
-        return self._apply_splitter(page_map, splitter)
+
+    def _chunk_token(self, page_map: PageMap, chunk_size: int, chunk_overlap: int) -> list:
+        """
+        按 Token 数量分块
+        
+        所有页面一次性批量编码并拼接成整篇文档的 token 序列（页与页之间插入换行），
+        再按窗口切分；块的起止页取窗口内第一个 / 最后一个非分隔 token 所在的页（页间插入的换行不归属任何页），
+        页码取两者中点所在的页，跨页的块在 page_range 中记录起止页
+        """
+        splitter = TokenWindowSplitter(chunk_size, chunk_overlap)
+        encoding = splitter.encoding
+        page_separator = encoding.encode_ordinary("\n")
+
+        token_ids = []
+        page_lengths = []
+        for page_tokens in encoding.encode_ordinary_batch(page_map.texts):
+            token_ids.extend(page_tokens)
+            token_ids.extend(page_separator)
+            page_lengths.append(len(page_tokens) + len(page_separator))
+        # page_ends[i] 为第 i 页（含其后的换行）在整篇 token 序列中的结束位置
+        page_ends = np.cumsum(page_lengths, dtype=np.int64)
+
+        windows = np.array(list(splitter.window_bounds(len(token_ids))), dtype=np.int64).reshape(-1, 2)
+        starts, ends = windows[:, 0], windows[:, 1]
+        # 页面正文 token 的位置（去掉各页末尾插入的换行分隔符）
+        is_text = np.ones(len(token_ids), dtype=bool)
+        is_text[((page_ends - len(page_separator))[:, None] + np.arange(len(page_separator))).ravel()] = False
+        text_positions = np.flatnonzero(is_text)
+        if not len(text_positions):
+            return []
+        # 只含分隔符的窗口解码后为空、会被跳过，这里裁剪下标只为保证取值合法
+        first_text = text_positions[np.minimum(np.searchsorted(text_positions, starts), len(text_positions) - 1)]
+        last_text = text_positions[np.maximum(np.searchsorted(text_positions, ends) - 1, 0)]
+        first_pages = _lookup_pages(page_ends, page_map.numbers, first_text)
+        last_pages = _lookup_pages(page_ends, page_map.numbers, last_text)
+        mid_pages = _lookup_pages(page_ends, page_map.numbers, (first_text + last_text) // 2)
+
+        chunks = []
+        chunk_id = 0
+        for (start, end), first_page, last_page, page_number in zip(windows.tolist(), first_pages, last_pages, mid_pages):
+            text = encoding.decode(token_ids[start:end]).strip()
+            if not text:
+                continue
+            chunk_id += 1
+            chunks.append({
+                "content": text,
+                "metadata": {
+                    "chunk_id": chunk_id,
+                    "page_number": page_number,
+                    "page_range": str(first_page) if first_page == last_page else f"{first_page}-{last_page}",
+                    "word_count": len(text.split())
+                }
+            })
+        return chunks
 
     def _chunk_markdown(self, text: str, metadata: dict) -> list:
-        headers_to_split_on = [
-            ("#", "Header 1"),
-            ("##", "Header 2"),
-            ("###", "Header 3"),
-        ]
-        splitter = MarkdownHeaderTextSplitter(headers_to_split_on=headers_to_split_on)
-        md_header_splits = splitter.split_text(text)
+        md_header_splits = self._MD_SPLITTER.split_text(text)
         
         chunks = []
         for i, split in enumerate(md_header_splits, 1):
@@ -163,19 +367,48 @@ class ChunkingService:
             })
         return chunks
 
-    def _apply_splitter(self, page_map: list, splitter) -> list:
+    def _split_pages(self, page_map: PageMap, splitter) -> list:
+        """
+        并行切分各页文本，返回与 page_map 顺序一致的分块结果
+        
+        释放 GIL 的原生分块器（Rust / tiktoken）使用线程池；
+        纯 Python 的 LangChain 分块器在页数足够多时使用进程池，否则顺序执行
+        """
+        texts = page_map.texts
+        workers = os.cpu_count() or 1
+        if len(texts) < 2 or workers < 2:
+            return [splitter.split_text(text) for text in texts]
+
+        if getattr(splitter, "releases_gil", False):
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(splitter.split_text, texts))
+
+        if len(texts) >= PROCESS_POOL_MIN_PAGES:
+            try:
+                return list(_get_process_pool().map(splitter.split_text, texts, chunksize=max(1, len(texts) // (workers * 4))))
+            except BrokenProcessPool:
+                # 工作进程异常退出后进程池不可再用，丢弃它（下次请求重新创建）并顺序处理本次请求
+                logger.warning("Process pool is broken, recreating it on next use and splitting sequentially")
+                _get_process_pool.cache_clear()
+
+        return [splitter.split_text(text) for text in texts]
+
+    def _apply_splitter(self, page_map: PageMap, splitter) -> list:
         chunks = []
-        for page_data in page_map:
-            split_texts = splitter.split_text(page_data['text'])
+        chunk_id = 0
+        for page, split_texts in zip(page_map.page_numbers(), self._split_pages(page_map, splitter)):
             for text in split_texts:
-                if text.strip():
-                    chunks.append({
-                        "content": text.strip(),
-                        "metadata": {
-                            "chunk_id": len(chunks) + 1,
-                            "page_number": page_data['page'],
-                            "page_range": str(page_data['page']),
-                            "word_count": len(text.split())
-                        }
-                    })
+                text = text.strip()
+                if not text:
+                    continue
+                chunk_id += 1
+                chunks.append({
+                    "content": text,
+                    "metadata": {
+                        "chunk_id": chunk_id,
+                        "page_number": page,
+                        "page_range": str(page),
+                        "word_count": len(text.split())
+                    }
+                })
         return chunks
@@ -2,11 +2,15 @@ import os
 import dotenv
 dotenv.load_dotenv()
 import json
+import logging
 from datetime import datetime
 from enum import Enum
 import boto3
 from langchain_community.embeddings import BedrockEmbeddings, OpenAIEmbeddings, HuggingFaceEmbeddings
 from utils.model_utils import get_huggingface_model_path
+from utils.vector_files import write_vector_sidecar
+
+logger = logging.getLogger(__name__)
 
 class EmbeddingProvider(str, Enum):
     """
@@ -185,6 +189,12 @@ class EmbeddingService:
                 **config_info,  # 配置信息放在顶层
                 "embeddings": embeddings
             }, f, ensure_ascii=False, indent=2, cls=CompactJSONEncoder)
+
+        # 额外写一份 FP16 的 Parquet 向量文件，索引时直接读取二进制向量
+        try:
+            write_vector_sidecar(filepath, [emb["embedding"] for emb in embeddings])
+        except Exception as e:
+            logger.warning(f"Failed to write vector sidecar for {filepath}: {str(e)}")
             
         return filepath
 
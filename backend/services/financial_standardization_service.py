@@ -1,15 +1,125 @@
 import os
 import time
-import json
+import asyncio
+import hashlib
 from datetime import datetime
+from functools import lru_cache
 from typing import List, Dict, Optional
 import logging
-from openai import OpenAI
-from pymilvus import MilvusClient, model
-import torch
+import orjson
+from diskcache import FanoutCache
+from openai import OpenAI, AsyncOpenAI
+from utils.config import build_search_params
+from utils.model_utils import get_default_device
 
 logger = logging.getLogger(__name__)
 
+DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+
+# 向量检索和 LLM 解释结果的磁盘缓存
+CACHE_DIR = os.getenv("FINANCIAL_CACHE_DIR", os.path.join(".cache", "financial_standardization"))
+CACHE_EXPIRE_SECONDS = int(os.getenv("FINANCIAL_CACHE_EXPIRE_SECONDS", 7 * 24 * 3600))
+# 温度高于该值时模型输出本身带有随机性，不读写缓存
+CACHE_MAX_TEMPERATURE = 0.5
+
+# 术语集合由 tools/import_financial_data.py 以 IP 度量（向量已归一化）建索引，索引信息缺失时按此度量查询
+FINANCIAL_METRIC_TYPE = "IP"
+
+# 实体识别 + 标准化单次请求允许的最大文本长度（字符），更长的文本按段落切分后分别请求
+RECOGNIZE_MAX_CHARS = 4000
+
+
+@lru_cache(maxsize=1)
+def _get_cache() -> FanoutCache:
+    """进程内共享的磁盘缓存，FanoutCache 按分片加锁，可在多线程间安全使用"""
+    return FanoutCache(directory=CACHE_DIR)
+
+
+def _cache_key(*parts) -> str:
+    """以输入内容的哈希作为缓存键"""
+    return hashlib.blake2b("\x1f".join(map(str, parts)).encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=8)
+def _get_client(api_key: str, base_url: str) -> OpenAI:
+    """
+    按 (api_key, base_url) 缓存 OpenAI 客户端
+    
+    客户端内部的 httpx 连接池随之复用，后续请求不再重复建立 TCP/TLS 连接
+    """
+    return OpenAI(api_key=api_key, base_url=base_url)
+
+
+@lru_cache(maxsize=8)
+def _get_async_client(api_key: str, base_url: str) -> AsyncOpenAI:
+    """按 (api_key, base_url) 缓存异步 OpenAI 客户端，供流式接口在事件循环中使用"""
+    return AsyncOpenAI(api_key=api_key, base_url=base_url)
+
+
+def _format_candidates(candidates: List[Dict]) -> str:
+    """将向量检索到的候选术语拼接为提示词中的参考信息"""
+    if not candidates:
+        return "未在标准术语库中找到相关术语。"
+    return "参考标准术语库中的相关术语：\n" + "".join(
+        f"- {c['term']} (类别: {c['category']}, 相似度: {c['distance']:.4f})\n" for c in candidates
+    )
+
+
+def _split_for_context(text: str, max_chars: int) -> List[str]:
+    """按行把长文本切成不超过 max_chars 的片段，单行超长时直接截断切分"""
+    segments = []
+    current = ""
+    for line in text.splitlines(keepends=True):
+        if len(current) + len(line) > max_chars:
+            segments.append(current)
+            current = ""
+        while len(line) > max_chars:
+            segments.append(line[:max_chars])
+            line = line[max_chars:]
+        current += line
+    if current.strip():
+        segments.append(current)
+    return [segment for segment in segments if segment.strip()]
+
+
+def _parse_json_content(content: str):
+    """解析 LLM 返回的 JSON，兼容 ```json 代码块包裹的输出"""
+    content = content.strip()
+    if content.startswith("```"):
+        content = content.split("\n", 1)[1] if "\n" in content else ""
+        content = content.rsplit("```", 1)[0]
+    return orjson.loads(content.encode("utf-8"))
+
+
+@lru_cache(maxsize=2)
+def _get_embedding_function(model_name: str, device: str):
+    """
+    缓存嵌入函数，服务实例之间共享同一份已加载的模型，避免每个请求重新加载 BGE-M3
+    
+    在 CUDA 上将模型权重转为 FP16；在 CPU 上对 Linear 层做动态 int8 量化，
+    权重带宽分别降为 1/2 和 1/4
+    """
+    import torch
+    from pymilvus import model
+
+    embedding_function = model.dense.SentenceTransformerEmbeddingFunction(
+        model_name=model_name,
+        device=device,
+        trust_remote_code=True
+    )
+    if device.startswith("cuda"):
+        embedding_function.model.half()
+    else:
+        try:
+            embedding_function.model = torch.ao.quantization.quantize_dynamic(
+                embedding_function.model,
+                {torch.nn.Linear},
+                dtype=torch.qint8
+            )
+        except Exception as e:
+            logger.warning(f"Dynamic int8 quantization failed, using FP32 model: {e}")
+    return embedding_function
+
 class FinancialStandardizationService:
     """
     金融术语标准化服务类：负责金融实体的识别与标准化
@@ -27,10 +137,14 @@ class FinancialStandardizationService:
             "其他"
         ]
         
-        # 初始化 Milvus 客户端
+        self.collection_name = collection_name
+        self._index_info = None
+        self._collection_version = None
+
+        # 初始化 Milvus 客户端（pymilvus 在此处才导入，未部署 Milvus 时不影响服务启动）
         try:
+            from pymilvus import MilvusClient
             self.client = MilvusClient(uri=milvus_uri)
-            self.collection_name = collection_name
             if not self.client.has_collection(self.collection_name):
                 logger.warning(f"Collection {self.collection_name} not found in Milvus. Standardization may rely solely on LLM.")
         except Exception as e:
@@ -39,11 +153,7 @@ class FinancialStandardizationService:
 
         # 初始化 Embedding 函数 (保持与 import_financial_data.py 一致)
         try:
-            self.embedding_function = model.dense.SentenceTransformerEmbeddingFunction(
-                model_name='BAAI/bge-m3',
-                device='cuda:0' if torch.cuda.is_available() else 'cpu',
-                trust_remote_code=True
-            )
+            self.embedding_function = _get_embedding_function('BAAI/bge-m3', get_default_device())
         except Exception as e:
             logger.error(f"Failed to load embedding model: {e}")
             self.embedding_function = None
@@ -52,42 +162,173 @@ class FinancialStandardizationService:
         """获取支持的实体类型"""
         return self.default_entity_types
 
+    def _get_index_info(self) -> Dict:
+        """读取向量字段的索引信息（索引类型与度量方式），首次调用后缓存在实例上"""
+        if self._index_info is None:
+            info = {}
+            try:
+                for index_name in self.client.list_indexes(self.collection_name, field_name="vector"):
+                    info = self.client.describe_index(self.collection_name, index_name) or {}
+                    break
+            except Exception as e:
+                logger.warning(f"Failed to describe index of {self.collection_name}: {e}")
+            self._index_info = info
+        return self._index_info
+
+    def _get_collection_version(self) -> str:
+        """
+        术语集合的版本标识（行数 + 索引类型 + 度量方式），作为检索缓存键的一部分
+        
+        重新导入或重建索引后版本随之变化，不会再命中旧数据的检索结果；
+        解释缓存以包含检索结果的提示词为键，也因此一并失效
+        """
+        if self._collection_version is None:
+            row_count = ""
+            try:
+                row_count = self.client.get_collection_stats(self.collection_name).get("row_count", "")
+            except Exception as e:
+                logger.warning(f"Failed to get stats of {self.collection_name}: {e}")
+            info = self._get_index_info()
+            self._collection_version = f"{row_count}:{info.get('index_type', '')}:{info.get('metric_type', '')}"
+        return self._collection_version
+
+    def _get_search_params(self, limit: int) -> Dict:
+        """根据集合实际使用的索引类型构造搜索参数"""
+        return build_search_params(self._get_index_info(), limit, default_metric=FINANCIAL_METRIC_TYPE)
+
     def search_similar_terms(self, query: str, limit: int = 5) -> List[Dict]:
         """
-        在 Milvus 中搜索相似的标准术语
+        在 Milvus 中搜索相似的标准术语，结果按 (集合, 集合版本, 查询, limit) 缓存
         """
         if not self.client or not self.embedding_function:
             logger.warning("Milvus client or embedding function not initialized. Skipping vector search.")
             return []
 
+        cache_key = _cache_key("search", self.collection_name, self._get_collection_version(), query, limit)
+        cached = _get_cache().get(cache_key)
+        if cached is not None:
+            return cached
+
+        results = self.search_similar_terms_batch([query], limit=limit)[0]
+        if results:
+            _get_cache().set(cache_key, results, expire=CACHE_EXPIRE_SECONDS)
+        return results
+
+    def search_similar_terms_batch(self, queries: List[str], limit: int = 5) -> List[List[Dict]]:
+        """
+        批量在 Milvus 中搜索相似的标准术语
+        
+        所有查询在一次前向计算中完成嵌入，并通过一次多向量 search 请求检索，
+        返回与 queries 一一对应的结果列表
+        """
+        if not queries:
+            return []
+
+        if not self.client or not self.embedding_function:
+            logger.warning("Milvus client or embedding function not initialized. Skipping vector search.")
+            return [[] for _ in queries]
+
         try:
+            import torch
             start_time = time.time()
-            query_embeddings = self.embedding_function([query])
+            with torch.inference_mode():
+                query_embeddings = self.embedding_function(queries)
             
             search_result = self.client.search(
                 collection_name=self.collection_name,
-                data=[query_embeddings[0].tolist()],
+                data=[embedding.tolist() for embedding in query_embeddings],
                 limit=limit,
-                output_fields=["term", "category"]
+                output_fields=["term", "category"],
+                search_params=self._get_search_params(limit)
             )
             end_time = time.time()
-            logger.info(f"Vector search for '{query}' took {end_time - start_time:.4f} seconds")
+            logger.info(f"Vector search for {queries} took {end_time - start_time:.4f} seconds")
             
-            results = []
-            for hit in search_result[0]:
-                results.append({
-                    "term": hit['entity'].get('term'),
-                    "category": hit['entity'].get('category'),
-                    "distance": float(hit['distance'])
-                })
-            return results
+            return [
+                [
+                    {
+                        "term": hit['entity'].get('term'),
+                        "category": hit['entity'].get('category'),
+                        "distance": float(hit['distance'])
+                    }
+                    for hit in hits
+                ]
+                for hits in search_result
+            ]
         except Exception as e:
-            logger.error(f"Error in search_similar_terms: {e}")
-            return []
+            logger.error(f"Error in search_similar_terms_batch: {e}")
+            return [[] for _ in queries]
+
+    def recognize_and_standardize(self, text: str, entity_types: Optional[List[str]] = None, api_key: Optional[str] = None) -> List[Dict]:
+        """
+        在一次 LLM 调用中同时完成实体识别与标准化
+        
+        与先识别实体、再逐个实体请求标准化相比，每段文本只需一次 API 往返；
+        超过 RECOGNIZE_MAX_CHARS 的文本按行切段，每段内的实体仍在同一次请求中处理。
+        识别完成后再用一次批量向量检索为所有实体附上标准术语库中的候选术语
+        
+        返回:
+            [{"entity", "type", "standardized", "explanation", "candidates"}, ...]
+        """
+        if not api_key:
+            api_key = os.getenv("DEEPSEEK_API_KEY")
+            if not api_key:
+                raise ValueError("DeepSeek API key not provided")
+
+        client = _get_client(api_key, DEEPSEEK_BASE_URL)
+        entity_types = entity_types or self.default_entity_types
+
+        entities = []
+        try:
+            for segment in _split_for_context(text, RECOGNIZE_MAX_CHARS):
+                prompt = f"""请从下面的文本中识别金融实体，并给出每个实体的标准化术语。
+            
+            实体类型限定为：{"、".join(entity_types)}
+            
+            文本：
+            {segment}
+            
+            请只返回 JSON 数组，不要包含其他内容，格式如下：
+            [{{"entity": "原文中的实体", "type": "实体类型", "standardized": "标准化术语", "explanation": "简要说明"}}]
+            如果没有识别到实体，返回 []。
+            """
 
-    def search_and_explain_stream(self, text: str, api_key: Optional[str] = None):
+                messages = [
+                    {"role": "system", "content": "你是一个专业的金融命名实体识别与术语标准化助手。"},
+                    {"role": "user", "content": prompt}
+                ]
+
+                llm_start_time = time.time()
+                response = client.chat.completions.create(
+                    model="deepseek-chat",
+                    messages=messages,
+                    temperature=0.1,
+                    max_tokens=2048
+                )
+                llm_end_time = time.time()
+                logger.info(f"DeepSeek recognize_and_standardize call took {llm_end_time - llm_start_time:.4f} seconds")
+
+                result = _parse_json_content(response.choices[0].message.content)
+                if isinstance(result, dict):
+                    result = result.get("entities", [])
+                entities.extend(item for item in result if isinstance(item, dict) and item.get("entity"))
+
+            candidates = self.search_similar_terms_batch([item["entity"] for item in entities], limit=5)
+            for item, item_candidates in zip(entities, candidates):
+                item["candidates"] = item_candidates
+
+            return entities
+
+        except Exception as e:
+            logger.error(f"Error in recognize_and_standardize: {str(e)}")
+            raise
+
+    async def search_and_explain_stream(self, text: str, api_key: Optional[str] = None):
         """
         流式搜索并解释金融术语
+        
+        异步生成器：向量检索放到线程池执行，LLM 输出通过 AsyncOpenAI 逐块转发，
+        等待网络数据期间不阻塞事件循环
         """
         try:
             if not api_key:
@@ -95,23 +336,14 @@ class FinancialStandardizationService:
                 if not api_key:
                     raise ValueError("DeepSeek API key not provided")
 
-            client = OpenAI(
-                api_key=api_key,
-                base_url="https://api.deepseek.com"
-            )
+            client = _get_async_client(api_key, DEEPSEEK_BASE_URL)
 
             # 1. 向量检索 (非流式，因为速度很快)
-            candidates = self.search_similar_terms(text, limit=10)
-            candidates_str = ""
-            if candidates:
-                candidates_str = "参考标准术语库中的相关术语：\n"
-                for c in candidates:
-                    candidates_str += f"- {c['term']} (类别: {c['category']}, 相似度: {c['distance']:.4f})\n"
-            else:
-                candidates_str = "未在标准术语库中找到相关术语。"
+            candidates = await asyncio.to_thread(self.search_similar_terms, text, limit=10)
+            candidates_str = _format_candidates(candidates)
 
             # 先发送候选词数据（以特殊格式，方便前端解析）
-            yield f"DATA: {json.dumps({'candidates': candidates})}\n\n"
+            yield f"DATA: {orjson.dumps({'candidates': candidates}).decode()}\n\n"
 
             # 2. LLM 流式解释
             explain_prompt = f"""你是一个金融领域的专家。用户输入了一个查询："{text}"。
@@ -131,7 +363,7 @@ class FinancialStandardizationService:
                 {"role": "user", "content": explain_prompt}
             ]
 
-            response = client.chat.completions.create(
+            response = await client.chat.completions.create(
                 model="deepseek-chat",
                 messages=messages,
                 temperature=0.3,
@@ -139,7 +371,7 @@ class FinancialStandardizationService:
                 stream=True
             )
 
-            for chunk in response:
+            async for chunk in response:
                 if chunk.choices[0].delta.content:
                     yield chunk.choices[0].delta.content
 
@@ -147,9 +379,11 @@ class FinancialStandardizationService:
             logger.error(f"Error in search_and_explain_stream: {str(e)}")
             yield f"ERROR: {str(e)}"
 
-    def search_and_explain(self, text: str, provider: str = "deepseek", model_name: str = "deepseek-v3", api_key: Optional[str] = None) -> Dict:
+    def search_and_explain(self, text: str, provider: str = "deepseek", model_name: str = "deepseek-v3", api_key: Optional[str] = None, temperature: float = 0.3) -> Dict:
         """
         直接在 Milvus 中搜索相似术语，并调用 LLM 解释中文含义
+        
+        解释结果按 (模型, 提示词) 缓存；temperature 高于 CACHE_MAX_TEMPERATURE 时跳过缓存
         """
         try:
             if not api_key:
@@ -157,20 +391,11 @@ class FinancialStandardizationService:
                 if not api_key:
                     raise ValueError("DeepSeek API key not provided")
 
-            client = OpenAI(
-                api_key=api_key,
-                base_url="https://api.deepseek.com"
-            )
+            client = _get_client(api_key, DEEPSEEK_BASE_URL)
 
             # 1. 向量检索
             candidates = self.search_similar_terms(text, limit=10)
-            candidates_str = ""
-            if candidates:
-                candidates_str = "参考标准术语库中的相关术语：\n"
-                for c in candidates:
-                    candidates_str += f"- {c['term']} (类别: {c['category']}, 相似度: {c['distance']:.4f})\n"
-            else:
-                candidates_str = "未在标准术语库中找到相关术语。"
+            candidates_str = _format_candidates(candidates)
 
             # 2. LLM 解释
             explain_prompt = f"""你是一个金融领域的专家。用户输入了一个查询："{text}"。
@@ -190,18 +415,26 @@ class FinancialStandardizationService:
                 {"role": "user", "content": explain_prompt}
             ]
 
-            llm_start_time = time.time()
-            response = client.chat.completions.create(
-                model="deepseek-chat",
-                messages=messages,
-                temperature=0.3,
-                max_tokens=1024
-            )
-            llm_end_time = time.time()
-            logger.info(f"DeepSeek API call for '{text}' took {llm_end_time - llm_start_time:.4f} seconds")
+            use_cache = temperature <= CACHE_MAX_TEMPERATURE
+            cache_key = _cache_key("explain", "deepseek-chat", explain_prompt)
+            explanation = _get_cache().get(cache_key) if use_cache else None
+            if explanation is not None:
+                logger.info(f"Using cached explanation for '{text}'")
+            else:
+                llm_start_time = time.time()
+                response = client.chat.completions.create(
+                    model="deepseek-chat",
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=1024
+                )
+                llm_end_time = time.time()
+                logger.info(f"DeepSeek API call for '{text}' took {llm_end_time - llm_start_time:.4f} seconds")
 
-            explanation = response.choices[0].message.content.strip()
-            logger.info(f"LLM Response: {explanation}")
+                explanation = response.choices[0].message.content.strip()
+                logger.info(f"LLM Response: {explanation}")
+                if use_cache:
+                    _get_cache().set(cache_key, explanation, expire=CACHE_EXPIRE_SECONDS)
             
             return {
                 "query": text,
@@ -4,8 +4,6 @@ from datetime import datetime
 from typing import List, Dict, Optional
 import logging
 from pathlib import Path
-from transformers import AutoModelForCausalLM, AutoTokenizer
-import torch
 from openai import OpenAI
 import requests
 from utils.model_utils import get_huggingface_model_path
@@ -56,6 +54,10 @@ class GenerationService:
             tokenizer: 对应的分词器
         """
         try:
+            # torch / transformers 仅本地模型需要，延迟导入以免拖慢服务启动
+            import torch
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+
             model_name = self.models["huggingface"][model_name]
             model_name = get_huggingface_model_path(model_name)
             model = AutoModelForCausalLM.from_pretrained(
@@ -1,6 +1,4 @@
 from pypdf import PdfReader
-from unstructured.partition.pdf import partition_pdf
-from unstructured.partition.auto import partition
 import pdfplumber
 import fitz  # PyMuPDF
 import logging
@@ -244,6 +242,10 @@ class LoadingService:
             # Combine strategy parameters with chunking parameters
             params = {**strategy_params.get(strategy, {"strategy": "fast"}), **chunking_params}
             
+            # unstructured 导入开销很大，只在使用该加载方式时才导入
+            from unstructured.partition.pdf import partition_pdf
+            from unstructured.partition.auto import partition
+
             # Use partition for general files, partition_pdf specifically for PDFs if needed
             try:
                 if file_ext == ".pdf":
@@ -1,15 +1,45 @@
 import logging
 from typing import Dict, List
-import fitz  # PyMuPDF
-import pandas as pd
 from datetime import datetime
 import os
-import pdfplumber
-from unstructured.partition.pdf import partition_pdf
-from unstructured.partition.md import partition_md
+import re
 
 logger = logging.getLogger(__name__)
 
+# 标题行：去掉首尾空白后长度小于 100，且以数字开头或不含小写字母且至少含一个大写字母
+# 长度限制由行首的前瞻断言完成，超长行在正则引擎内直接被跳过
+TITLE_LINE_RE = re.compile(
+    r'^[^\S\n]*(?=\S(?:[^\n]{0,97}\S)?[^\S\n]*$)(\d[^\n]*?|[^a-z\n]*[A-Z][^a-z\n]*?)[^\S\n]*$',
+    re.MULTILINE
+)
+
+
+def _content_lines(text: str) -> list:
+    """按行拆分正文，去掉每行首尾空白并丢弃空行"""
+    return [line for line in map(str.strip, text.split('\n')) if line]
+
+
+def _markdown_row(cells: list) -> str:
+    return "| " + " | ".join(
+        "" if cell is None else str(cell).replace("\n", " ").replace("|", "\\|")
+        for cell in cells
+    ) + " |"
+
+
+def _outside_bboxes(obj: dict, bboxes: list) -> bool:
+    """判断页面对象的中心点是否不落在任何表格区域 (x0, top, x1, bottom) 内"""
+    x = (obj["x0"] + obj["x1"]) / 2
+    y = (obj["top"] + obj["bottom"]) / 2
+    return not any(x0 <= x <= x1 and top <= y <= bottom for x0, top, x1, bottom in bboxes)
+
+
+def _table_to_markdown(table: list) -> str:
+    """将 pdfplumber 提取的表格（首行为表头）直接拼接成 Markdown，不经过 pandas"""
+    header, *rows = table
+    lines = [_markdown_row(header), "|" + "---|" * len(header)]
+    lines.extend(_markdown_row(row) for row in rows)
+    return "\n".join(lines)
+
 class ParsingService:
     """
     文档解析服务类
@@ -102,24 +132,23 @@ class ParsingService:
         current_content = []
 
         for page in page_map:
-            lines = page["text"].split('\n')
-            for line in lines:
-                line = line.strip()
-                if not line: continue
-                
-                # Heuristic for title: short, not ending with punctuation, maybe upper
-                if len(line) < 100 and (line.isupper() or line[0].isdigit()):
-                    if current_content:
-                        parsed_content.append({
-                            "type": "section",
-                            "title": current_title,
-                            "content": '\n'.join(current_content),
-                            "page": page["page"]
-                        })
-                    current_title = line
-                    current_content = []
-                else:
-                    current_content.append(line)
+            text = page["text"]
+            body_start = 0
+            # Heuristic for title: short, starts with a digit or is upper case
+            for match in TITLE_LINE_RE.finditer(text):
+                title = match.group(1)
+                current_content.extend(_content_lines(text[body_start:match.start()]))
+                if current_content:
+                    parsed_content.append({
+                        "type": "section",
+                        "title": current_title,
+                        "content": '\n'.join(current_content),
+                        "page": page["page"]
+                    })
+                current_title = title
+                current_content = []
+                body_start = match.end()
+            current_content.extend(_content_lines(text[body_start:]))
 
         if current_content:
             parsed_content.append({
@@ -133,43 +162,84 @@ class ParsingService:
 
     def _parse_with_pdfplumber(self, file_path: str) -> list:
         """使用 pdfplumber 提取文本和表格"""
-        parsed_content = []
         try:
-            with pdfplumber.open(file_path) as pdf:
-                for i, page in enumerate(pdf.pages, 1):
-                    # 1. 提取表格
-                    tables = page.extract_tables()
-                    for table in tables:
-                        if table:
-                            df = pd.DataFrame(table[1:], columns=table[0])
-                            parsed_content.append({
-                                "type": "table",
-                                "content": df.to_markdown(),
-                                "page": i,
-                                "metadata": {"rows": len(df), "cols": len(df.columns)}
-                            })
-                    
-                    # 2. 提取文本
-                    text = page.extract_text()
-                    if text:
-                        parsed_content.append({
-                            "type": "text",
-                            "content": text,
-                            "page": i
-                        })
-            return parsed_content
+            return list(self._iter_pdfplumber(file_path))
         except Exception as e:
             logger.error(f"pdfplumber parsing error: {str(e)}")
             return []
 
+    def _iter_pdfplumber(self, file_path: str):
+        """逐页产出 pdfplumber 解析结果，每页处理完即释放该页缓存的对象"""
+        import pdfplumber
+
+        with pdfplumber.open(file_path) as pdf:
+            for i, page in enumerate(pdf.pages, 1):
+                # 1. 提取表格（只做一次表格检测，保留其区域用于过滤正文）
+                tables = page.find_tables()
+                for table in tables:
+                    rows = table.extract()
+                    if rows:
+                        yield {
+                            "type": "table",
+                            "content": _table_to_markdown(rows),
+                            "page": i,
+                            "metadata": {"rows": len(rows) - 1, "cols": len(rows[0])}
+                        }
+
+                # 2. 提取表格区域之外的文本，避免表格内容重复出现在正文中
+                text_page = page
+                if tables:
+                    bboxes = [table.bbox for table in tables]
+                    text_page = page.filter(lambda obj: _outside_bboxes(obj, bboxes))
+                text = text_page.extract_text()
+                if text:
+                    yield {
+                        "type": "text",
+                        "content": text,
+                        "page": i
+                    }
+
+                page.flush_cache()
+
+    def _pdf_needs_hi_res(self, file_path: str) -> bool:
+        """
+        用 PyMuPDF 快速探测 PDF 是否需要 hi_res（版面模型 + OCR）
+        
+        含图像（可能是扫描件）或没有可提取文本时返回 True；探测失败时保守地返回 True
+        """
+        try:
+            import fitz  # PyMuPDF
+
+            has_text = False
+            with fitz.open(file_path) as doc:
+                for page in doc:
+                    if page.get_images():
+                        return True
+                    if not has_text and page.get_text().strip():
+                        has_text = True
+            return not has_text
+        except Exception as e:
+            logger.warning(f"Failed to probe PDF with PyMuPDF, assuming hi_res is needed: {str(e)}")
+            return True
+
     def _parse_with_unstructured(self, file_path: str) -> list:
         """使用 unstructured hi_res 提取各种元素（含图像占位）"""
         parsed_content = []
         try:
+            from unstructured.partition.pdf import partition_pdf
+            from unstructured.partition.md import partition_md
+
             file_ext = os.path.splitext(file_path)[1].lower()
             elements = []
             
-            if file_ext == ".pdf":
+            if file_ext == ".pdf" and not self._pdf_needs_hi_res(file_path):
+                logger.info("PDF has extractable text and no images, using 'fast' strategy")
+                elements = partition_pdf(
+                    filename=file_path,
+                    strategy="fast",
+                    chunking_strategy="by_title"
+                )
+            elif file_ext == ".pdf":
                 try:
                     logger.info("Attempting hi_res parsing with unstructured...")
                     elements = partition_pdf(
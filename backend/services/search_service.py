@@ -1,14 +1,50 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
 import logging
 from datetime import datetime
-from pymilvus import connections, Collection, utility
 from services.embedding_service import EmbeddingService
-from utils.config import VectorDBProvider, MILVUS_CONFIG
+from services.vector_store_service import connect_milvus, get_client, get_milvus_collection
+from utils.config import VectorDBProvider, MILVUS, CHROMA, PROVIDER_CONFIGS, build_search_params
+from concurrent.futures import ThreadPoolExecutor
 import os
 import json
 
+if TYPE_CHECKING:
+    from pymilvus import Collection
+
 logger = logging.getLogger(__name__)
 
+# 并行统计集合实体数量时使用的最大线程数
+COUNT_MAX_WORKERS = 8
+
+
+def _get_search_params(collection: "Collection", top_k: int, profile: Optional[str] = None,
+                       num_entities: Optional[int] = None) -> Dict[str, Any]:
+    """根据集合向量字段上实际建立的索引与集合规模构造查询参数，见 build_search_params"""
+    index_info = {}
+    for index in collection.indexes:
+        if index.field_name == "vector":
+            index_info = index.params
+            break
+    return build_search_params(index_info, top_k, profile, vector_count=num_entities)
+
+
+def _count_collections(names: List[str], count_fn) -> List[Dict[str, Any]]:
+    """
+    并行调用 count_fn 统计各集合的实体数量，返回顺序与 names 一致；统计失败的集合会被跳过
+    """
+    def count_one(name):
+        try:
+            return {"id": name, "name": name, "count": count_fn(name)}
+        except Exception as e:
+            logger.error(f"Error getting info for collection {name}: {str(e)}")
+            return None
+
+    if not names:
+        return []
+    with ThreadPoolExecutor(max_workers=min(COUNT_MAX_WORKERS, len(names))) as executor:
+        return [info for info in executor.map(count_one, names) if info is not None]
+
+
 class SearchService:
     """
     搜索服务类，负责向量数据库的连接和向量搜索功能
@@ -20,7 +56,7 @@ class SearchService:
         创建嵌入服务实例，设置Milvus连接URI，初始化搜索结果保存目录
         """
         self.embedding_service = EmbeddingService()
-        self.milvus_uri = MILVUS_CONFIG["uri"]
+        self.milvus_uri = PROVIDER_CONFIGS[MILVUS]["uri"]
         self.search_results_dir = "04-search-results"
         os.makedirs(self.search_results_dir, exist_ok=True)
 
@@ -49,56 +85,22 @@ class SearchService:
         Raises:
             Exception: 连接或查询集合时发生错误
         """
-        if provider == VectorDBProvider.MILVUS.value:
+        if provider == MILVUS:
             try:
-                connections.connect(
-                    alias="default",
-                    uri=self.milvus_uri
-                )
-                
-                collections = []
+                from pymilvus import utility
+                connect_milvus(self.milvus_uri)
                 collection_names = utility.list_collections()
-                
-                for name in collection_names:
-                    try:
-                        collection = Collection(name)
-                        collections.append({
-                            "id": name,
-                            "name": name,
-                            "count": collection.num_entities
-                        })
-                    except Exception as e:
-                        logger.error(f"Error getting info for collection {name}: {str(e)}")
-                
-                return collections
+                return _count_collections(collection_names, lambda name: get_milvus_collection(name).num_entities)
                 
             except Exception as e:
                 logger.error(f"Error listing collections: {str(e)}")
                 raise
-            finally:
-                connections.disconnect("default")
-        elif provider == VectorDBProvider.CHROMA.value:
+        elif provider == CHROMA:
             try:
-                from chromadb import PersistentClient
-                
-                chroma_persist_dir = "03-vector-store/chroma"
-                client = PersistentClient(path=chroma_persist_dir)
+                client = get_client(CHROMA)
                 
-                collections = []
                 collection_names = [col.name for col in client.list_collections()]
-                
-                for name in collection_names:
-                    try:
-                        collection = client.get_collection(name)
-                        collections.append({
-                            "id": name,
-                            "name": name,
-                            "count": collection.count()
-                        })
-                    except Exception as e:
-                        logger.error(f"Error getting info for collection {name}: {str(e)}")
-                
-                return collections
+                return _count_collections(collection_names, lambda name: client.get_collection(name).count())
                 
             except Exception as e:
                 logger.error(f"Error listing Chroma collections: {str(e)}")
@@ -154,7 +156,8 @@ class SearchService:
                     threshold: float = 0.7,
                     word_count_threshold: int = 20,
                     save_results: bool = False,
-                    provider: str = VectorDBProvider.MILVUS.value) -> Dict[str, Any]:
+                    provider: str = VectorDBProvider.MILVUS.value,
+                    profile: Optional[str] = None) -> Dict[str, Any]:
         """
         执行向量搜索
         
@@ -166,6 +169,7 @@ class SearchService:
             word_count_threshold (int): 文本字数阈值，低于此值的结果将被过滤，默认为20
             save_results (bool): 是否保存搜索结果，默认为False
             provider (str): 向量数据库提供商，默认为Milvus
+            profile (Optional[str]): Milvus 查询档位（latency / balanced / recall），默认使用索引的默认参数
             
         Returns:
             Dict[str, Any]: 包含搜索结果的字典，如果保存结果则包含保存路径
@@ -187,21 +191,19 @@ class SearchService:
 
             logger.info(f"Starting search with parameters - Collection: {collection_id}, Query: {query}, Top K: {top_k}, Provider: {provider}")
             
-            if provider == VectorDBProvider.MILVUS.value:
-                # 连接到 Milvus
+            if provider == MILVUS:
+                # 连接到 Milvus（复用已建立的连接）
                 logger.info(f"Connecting to Milvus at {self.milvus_uri}")
-                connections.connect(
-                    alias="default",
-                    uri=self.milvus_uri
-                )
+                connect_milvus(self.milvus_uri)
                 
                 # 获取collection
                 logger.info(f"Loading collection: {collection_id}")
-                collection = Collection(collection_id)
+                collection = get_milvus_collection(collection_id)
                 collection.load()
                 
                 # 记录collection的基本信息
-                logger.info(f"Collection info - Entities: {collection.num_entities}")
+                num_entities = collection.num_entities
+                logger.info(f"Collection info - Entities: {num_entities}")
                 
                 # 从collection中读取embedding配置
                 logger.info("Querying sample entity for embedding configuration")
@@ -226,10 +228,7 @@ class SearchService:
                 logger.info(f"Query embedding created with dimension: {len(query_embedding)}")
                 
                 # 执行搜索
-                search_params = {
-                    "metric_type": "COSINE",
-                    "params": {"nprobe": 10}
-                }
+                search_params = _get_search_params(collection, top_k, profile, num_entities)
                 logger.info(f"Executing search with params: {search_params}")
                 logger.info(f"Word count threshold filter: word_count >= {word_count_threshold}")
                 
@@ -275,13 +274,10 @@ class SearchService:
                                 }
                             })
             
-            elif provider == VectorDBProvider.CHROMA.value:
+            elif provider == CHROMA:
                 # 连接到 Chroma
                 logger.info(f"Connecting to Chroma")
-                from chromadb import PersistentClient
-                
-                chroma_persist_dir = "03-vector-store/chroma"
-                client = PersistentClient(path=chroma_persist_dir)
+                client = get_client(CHROMA)
                 
                 # 获取collection
                 logger.info(f"Getting collection: {collection_id}")
@@ -379,7 +375,4 @@ class SearchService:
             
         except Exception as e:
             logger.error(f"Error performing search: {str(e)}")
-            raise
-        finally:
-            if provider == VectorDBProvider.MILVUS.value:
-                connections.disconnect("default") 
\ No newline at end of file
+            raise 
\ No newline at end of file
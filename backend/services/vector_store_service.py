@@ -1,36 +1,165 @@
 import os
+import re
+import hashlib
+import time
 from datetime import datetime
-import json
-from typing import List, Dict, Any
+from functools import lru_cache
+import mmap
+import orjson
+from typing import List, Dict, Any, TYPE_CHECKING
 import logging
 from pathlib import Path
-from pymilvus import connections, utility
-from pymilvus import Collection, DataType, FieldSchema, CollectionSchema
-from utils.config import VectorDBProvider, MILVUS_CONFIG  # Updated import
+import numpy as np
+from utils.config import VectorDBProvider, MILVUS, CHROMA, MILVUS_CONFIG, PROVIDER_CONFIGS, CONFIG_HASH, MILVUS_BULK_INSERT_CONFIG, configure_hnsw_params, resolve_index_mode, prefers_disk_index, select_index  # Updated import
+from utils.vector_files import read_vector_sidecar
 from pypinyin import lazy_pinyin, Style
-from langchain_community.vectorstores import Chroma
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings  # 添加嵌入函数导入
 
+# pymilvus / chromadb 只在选中对应提供商时才导入，只用其中一种数据库时不必加载另一种
+if TYPE_CHECKING:
+    from pymilvus import Collection, CollectionSchema
+
 logger = logging.getLogger(__name__)
 
+# Chroma 单次 add 的最大条数（实际取该值与客户端 max_batch_size 中的较小者）
+CHROMA_MAX_BATCH_SIZE = 40000
+
+# collection 名称中不允许出现的字符（Milvus / Chroma 只接受字母、数字、下划线和连字符）
+_INVALID_COLLECTION_CHARS = re.compile(r'[^A-Za-z0-9_\-]')
+# 名称首尾的非字母数字字符
+_EDGE_NON_ALNUM = re.compile(r'^[^A-Za-z0-9]+|[^A-Za-z0-9]+$')
+
+
+def connect_milvus(uri: str, alias: str = "default") -> str:
+    """
+    确保 alias 对应的 Milvus 连接已建立，返回 alias
+    
+    连接在进程内保持打开并被后续请求复用，不再每次操作都重新握手、用完即断开；
+    超时与 keepalive 取自 MILVUS_CONFIG["connection"]
+    """
+    from pymilvus import connections
+
+    if not connections.has_connection(alias):
+        connections.connect(alias=alias, uri=uri, **MILVUS_CONFIG["connection"])
+    return alias
+
+
+# Collection 句柄缓存的容量：句柄本身很小，按集合总数而不是并发数设置，
+# 否则 search_service 并行统计全部集合实体数时会不断互相淘汰，缓存形同虚设
+MILVUS_COLLECTION_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=MILVUS_COLLECTION_CACHE_SIZE)
+def _cached_milvus_collection(name: str, config_hash: str) -> "Collection":
+    from pymilvus import Collection
+    return Collection(name)
+
+
+def get_milvus_collection(name: str) -> "Collection":
+    """
+    返回缓存的 Collection 句柄，避免每次请求都重新构造（构造时需要一次 describe_collection RPC）
+    
+    缓存以 CONFIG_HASH 为键的一部分；集合被删除后需调用 invalidate_milvus_collections 清空缓存
+    """
+    return _cached_milvus_collection(name, CONFIG_HASH)
+
+
+def invalidate_milvus_collections():
+    """集合被删除或重建后清空 Collection 句柄缓存"""
+    _cached_milvus_collection.cache_clear()
+
+
+def _file_digest(file_path: str) -> str:
+    """按块读取文件计算 BLAKE2b 摘要"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=4)
+def get_chroma_client(persist_dir: str):
+    """按持久化目录缓存 Chroma PersistentClient"""
+    from chromadb import PersistentClient
+    return PersistentClient(path=persist_dir)
+
+
+# 各提供商由其配置（PROVIDER_CONFIGS[provider]）构造客户端的函数
+_CLIENT_FACTORIES = {
+    MILVUS: lambda provider_config: connect_milvus(provider_config["uri"]),
+    CHROMA: lambda provider_config: get_chroma_client(provider_config["settings"]["persist_directory"])
+}
+
+
+def get_client(provider: VectorDBProvider):
+    """
+    按提供商返回客户端，对应的数据库库在此时才导入
+    
+    Milvus 返回已建立连接的 alias（ORM 接口按 alias 取连接），Chroma 返回缓存的 PersistentClient
+    """
+    provider = VectorDBProvider(provider)
+    return _CLIENT_FACTORIES[provider](PROVIDER_CONFIGS[provider])
+
+
+@lru_cache(maxsize=512)
+def _sanitize_collection_name(filename: str) -> str:
+    """
+    由文档文件名生成合法的 collection 名称前缀，Milvus 与 Chroma 索引共用
+    
+    参数:
+        filename: 文档文件名
+        
+    返回:
+        仅含字母、数字、下划线和连字符，长度 3-63 且首尾为字母或数字的名称
+    """
+    # 如果有 .pdf 后缀，移除它
+    base_name = filename.replace('.pdf', '') if filename else "doc"
+    
+    # Convert Chinese characters to pinyin, replace hyphens with underscores
+    base_name = ''.join(lazy_pinyin(base_name, style=Style.NORMAL)).replace('-', '_')
+    
+    # Ensure the collection name starts with a letter or number (Chroma requirement)
+    if not base_name or not base_name[0].isalnum():
+        base_name = f"doc_{base_name}"
+    
+    # Remove any invalid characters for Chroma
+    base_name = _INVALID_COLLECTION_CHARS.sub('', base_name)
+    
+    # Truncate if necessary (Chroma requires 3-63 characters)
+    if len(base_name) < 3:
+        base_name = f"{base_name}___"[:63]
+    elif len(base_name) > 63:
+        base_name = base_name[:63]
+    
+    # Ensure it doesn't start or end with non-alphanumeric
+    return _EDGE_NON_ALNUM.sub('', base_name)
+
+
 class VectorDBConfig:
     """
     向量数据库配置类，用于存储和管理向量数据库的配置信息
     """
-    def __init__(self, provider: str, index_mode: str):
+    def __init__(self, provider: str, index_mode: str, overwrite: bool = False, skip_if_exists: bool = False):
         """
         初始化向量数据库配置
         
         参数:
-            provider: 向量数据库提供商名称
-            index_mode: 索引模式
+            provider: 向量数据库提供商名称，未知名称会抛出 ValueError
+            index_mode: 索引模式，可被环境变量 MILVUS_INDEX_TYPE 覆盖
+            overwrite: 索引前删除同一文档、同一嵌入提供商的旧集合
+            skip_if_exists: 已存在由同一嵌入文件（内容摘要相同）生成的集合时直接复用，不再重新写入
         """
-        self.provider = provider
-        self.index_mode = index_mode
-        self.milvus_uri = MILVUS_CONFIG["uri"]
+        self.provider = VectorDBProvider(provider)
+        self.index_mode = resolve_index_mode(index_mode)
+        if self.index_mode != index_mode:
+            logger.info(f"Index mode {index_mode} overridden to {self.index_mode} by MILVUS_INDEX_TYPE")
+        self.overwrite = overwrite
+        self.skip_if_exists = skip_if_exists
+        self.milvus_uri = PROVIDER_CONFIGS[MILVUS]["uri"]
         # Chroma配置
-        self.chroma_persist_dir = "03-vector-store/chroma"
+        self.chroma_persist_dir = PROVIDER_CONFIGS[CHROMA]["settings"]["persist_directory"]
 
     def _get_milvus_index_type(self, index_mode: str) -> str:
         """
@@ -44,17 +173,22 @@ class VectorDBConfig:
         """
         return MILVUS_CONFIG["index_types"].get(index_mode, "FLAT")
     
-    def _get_milvus_index_params(self, index_mode: str) -> Dict[str, Any]:
+    def _get_milvus_index_params(self, index_mode: str, vector_count: int = None) -> Dict[str, Any]:
         """
         根据索引模式获取Milvus索引参数
         
         参数:
             index_mode: 索引模式
+            vector_count: 集合中的向量数量，HNSW 模式下据此选择 M / efConstruction
             
         返回:
             对应的Milvus索引参数字典
         """
-        return MILVUS_CONFIG["index_params"].get(index_mode, {})
+        if index_mode == "hnsw" and vector_count is not None:
+            params = configure_hnsw_params(vector_count)
+            return {"M": params["M"], "efConstruction": params["efConstruction"]}
+        # 配置为只读映射，返回普通 dict 副本供 pymilvus 序列化
+        return dict(MILVUS_CONFIG["index_params"].get(index_mode, {}))
 
 class VectorStoreService:
     """
@@ -80,25 +214,28 @@ class VectorStoreService:
         """
         return config._get_milvus_index_type(config.index_mode)
     
-    def _get_milvus_index_params(self, config: VectorDBConfig) -> Dict[str, Any]:
+    def _get_milvus_index_params(self, config: VectorDBConfig, vector_count: int = None) -> Dict[str, Any]:
         """
         从配置对象获取Milvus索引参数
         
         参数:
             config: 向量数据库配置对象
+            vector_count: 集合中的向量数量
             
         返回:
             Milvus索引参数字典
         """
-        return config._get_milvus_index_params(config.index_mode)
+        return config._get_milvus_index_params(config.index_mode, vector_count)
     
-    def index_embeddings(self, embedding_file: str, config: VectorDBConfig) -> Dict[str, Any]:
+    def index_embeddings(self, embedding_file: str, config: VectorDBConfig, persist_now: bool = True) -> Dict[str, Any]:
         """
         将嵌入向量索引到向量数据库
         
         参数:
             embedding_file: 嵌入向量文件路径
             config: 向量数据库配置对象
+            persist_now: 是否在写入后立即持久化（仅 Chroma）；连续索引多个文件时
+                可对前 N-1 个传 False，只在最后一个文件后持久化一次
             
         返回:
             索引结果信息字典
@@ -107,12 +244,15 @@ class VectorStoreService:
         
         # 读取embedding文件
         embeddings_data = self._load_embeddings(embedding_file)
+        embeddings_data["source_digest"] = _file_digest(embedding_file)
         
         # 根据不同的数据库进行索引
-        if config.provider == VectorDBProvider.MILVUS:
-            result = self._index_to_milvus(embeddings_data, config)
-        elif config.provider == VectorDBProvider.CHROMA:
-            result = self._index_to_chroma(embeddings_data, config)
+        if config.provider == MILVUS:
+            # 存在 Parquet 向量文件时直接使用其中的二进制向量
+            vectors = read_vector_sidecar(embedding_file, len(embeddings_data["embeddings"]))
+            result = self._index_to_milvus(embeddings_data, config, vectors=vectors)
+        elif config.provider == CHROMA:
+            result = self._index_to_chroma(embeddings_data, config, persist_now=persist_now)
         else:
             raise ValueError(f"Unsupported vector database provider: {config.provider}")
         
@@ -121,17 +261,20 @@ class VectorStoreService:
         
         return {
             "database": config.provider,
-            "index_mode": config.index_mode,
+            "index_mode": result.get("index_mode", config.index_mode),
             "total_vectors": len(embeddings_data["embeddings"]),
             "index_size": result.get("index_size", "N/A"),
             "processing_time": processing_time,
-            "collection_name": result.get("collection_name", "N/A")
+            "collection_name": result.get("collection_name", "N/A"),
+            "skipped": result.get("skipped", False)
         }
     
     def _load_embeddings(self, file_path: str) -> Dict[str, Any]:
         """
         加载embedding文件，返回配置信息和embeddings
         
+        文件以只读方式 mmap 后直接交给 orjson 解析，不经过 Python 层的 str 解码
+        
         参数:
             file_path: 嵌入向量文件路径
             
@@ -139,9 +282,10 @@ class VectorStoreService:
             包含嵌入向量和元数据的字典
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
                 logger.info(f"Loading embeddings from {file_path}")
+                with memoryview(mm) as view:
+                    data = orjson.loads(view)
                 
                 if not isinstance(data, dict) or "embeddings" not in data:
                     raise ValueError("Invalid embedding file format: missing 'embeddings' key")
@@ -154,62 +298,53 @@ class VectorStoreService:
             logger.error(f"Error loading embeddings from {file_path}: {str(e)}")
             raise
     
-    def _index_to_milvus(self, embeddings_data: Dict[str, Any], config: VectorDBConfig) -> Dict[str, Any]:
+    def _index_to_milvus(self, embeddings_data: Dict[str, Any], config: VectorDBConfig, vectors: np.ndarray = None) -> Dict[str, Any]:
         """
         将嵌入向量索引到Milvus数据库
         
         参数:
             embeddings_data: 嵌入向量数据
             config: 向量数据库配置对象
+            vectors: 预先读取的 float32 向量矩阵（来自 Parquet 向量文件），为空时使用 JSON 中的向量
             
         返回:
             索引结果信息字典
         """
         try:
+            from pymilvus import utility, Collection, DataType, FieldSchema, CollectionSchema
+
             # 使用 filename 作为 collection 名称前缀
-            filename = embeddings_data.get("filename", "")
-            # 如果有 .pdf 后缀，移除它
-            base_name = filename.replace('.pdf', '') if filename else "doc"
-            
-            # Convert Chinese characters to pinyin
-            base_name = ''.join(lazy_pinyin(base_name, style=Style.NORMAL))
-            
-            # Replace hyphens with underscores in the base name
-            base_name = base_name.replace('-', '_')
-            
-            # Ensure the collection name starts with a letter or number (Chroma requirement)
-            # and only contains alphanumeric, underscores, or hyphens
-            if not base_name[0].isalnum():
-                # If first character is not alphanumeric, add a letter prefix
-                base_name = f"doc_{base_name}"
-            
-            # Remove any invalid characters for Chroma
-            base_name = ''.join(c for c in base_name if c.isalnum() or c in ['_', '-'])
-            
-            # Truncate if necessary (Chroma requires 3-63 characters)
-            if len(base_name) < 3:
-                base_name = f"{base_name}___"[:63]
-            elif len(base_name) > 63:
-                base_name = base_name[:63]
-            
-            # Ensure it doesn't end with non-alphanumeric
-            while base_name and not base_name[-1].isalnum():
-                base_name = base_name[:-1]
-            
-            # Ensure it doesn't start with non-alphanumeric (should already be handled)
-            while base_name and not base_name[0].isalnum():
-                base_name = base_name[1:]
+            base_name = _sanitize_collection_name(embeddings_data.get("filename", ""))
             
             # Get embedding provider
             embedding_provider = embeddings_data.get("embedding_provider", "unknown")
             timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
             collection_name = f"{base_name}_{embedding_provider}_{timestamp}"
             
-            # 连接到Milvus
-            connections.connect(
-                alias="default", 
-                uri=config.milvus_uri
-            )
+            # 连接到Milvus（复用已建立的连接）
+            connect_milvus(config.milvus_uri)
+
+            # 处理同一文档、同一嵌入提供商此前生成的集合
+            source_digest = embeddings_data.get("source_digest", "")
+            # 只有设置了 skip_if_exists / overwrite 时才需要列出已有集合，避免每次索引都多一次 list_collections RPC
+            existing = []
+            if config.skip_if_exists or config.overwrite:
+                existing = self._find_existing_milvus_collections(f"{base_name}_{embedding_provider}_")
+            if config.skip_if_exists and source_digest:
+                for name in existing:
+                    collection = Collection(name)
+                    if f"source_digest={source_digest}" in collection.description:
+                        logger.info(f"Collection {name} was built from the same embedding file, skipping indexing")
+                        return {
+                            "index_size": collection.num_entities,
+                            "collection_name": name,
+                            "skipped": True
+                        }
+            if config.overwrite and existing:
+                for name in existing:
+                    logger.info(f"Dropping previous collection {name}")
+                    utility.drop_collection(name)
+                invalidate_milvus_collections()
             
             # 从顶层配置获取向量维度
             vector_dim = int(embeddings_data.get("vector_dimension"))
@@ -232,32 +367,53 @@ class VectorStoreService:
                 {"name": "embedding_provider", "dtype": "VARCHAR", "max_length": 50},
                 {"name": "embedding_model", "dtype": "VARCHAR", "max_length": 50},
                 {"name": "embedding_timestamp", "dtype": "VARCHAR", "max_length": 50},
-                {
-                    "name": "vector",
-                    "dtype": "FLOAT_VECTOR",
-                    "dim": vector_dim,
-                    "params": self._get_milvus_index_params(config)
-                }
+                # 索引参数只在 create_index 时指定，字段上不携带
+                {"name": "vector", "dtype": "FLOAT_VECTOR", "dim": vector_dim}
             ]
             
-            # 准备数据为列表格式
-            entities = []
-            for emb in embeddings_data["embeddings"]:
-                entity = {
-                    "content": str(emb["metadata"].get("content", "")),
-                    "document_name": embeddings_data.get("filename", ""),  # 使用 filename 而不是 document_name
-                    "chunk_id": int(emb["metadata"].get("chunk_id", 0)),
-                    "total_chunks": int(emb["metadata"].get("total_chunks", 0)),
-                    "word_count": int(emb["metadata"].get("word_count", 0)),
-                    "page_number": str(emb["metadata"].get("page_number", 0)),
-                    "page_range": str(emb["metadata"].get("page_range", "")),
-                    # "chunking_method": str(emb["metadata"].get("chunking_method", "")),
-                    "embedding_provider": embeddings_data.get("embedding_provider", ""),  # 从顶层配置获取
-                    "embedding_model": embeddings_data.get("embedding_model", ""),  # 从顶层配置获取
-                    "embedding_timestamp": str(emb["metadata"].get("embedding_timestamp", "")),
-                    "vector": [float(x) for x in emb.get("embedding", [])]
-                }
-                entities.append(entity)
+            # 准备数据为列格式：标量字段各自一列，向量直接写入 float32 矩阵，
+            # 按 schema 字段顺序（跳过自增主键）一次性插入，避免逐元素 float() 装箱
+            embeddings = embeddings_data["embeddings"]
+            num_entities = len(embeddings)
+            document_name = embeddings_data.get("filename", "")  # 使用 filename 而不是 document_name
+            embedding_provider = embeddings_data.get("embedding_provider", "")  # 从顶层配置获取
+            embedding_model = embeddings_data.get("embedding_model", "")  # 从顶层配置获取
+
+            contents = []
+            chunk_ids = []
+            total_chunks = []
+            word_counts = []
+            page_numbers = []
+            page_ranges = []
+            embedding_timestamps = []
+            fill_vectors = vectors is None or vectors.shape != (num_entities, vector_dim)
+            if fill_vectors:
+                vectors = np.empty((num_entities, vector_dim), dtype=np.float32)
+            for i, emb in enumerate(embeddings):
+                metadata = emb["metadata"]
+                contents.append(str(metadata.get("content", "")))
+                chunk_ids.append(int(metadata.get("chunk_id", 0)))
+                total_chunks.append(int(metadata.get("total_chunks", 0)))
+                word_counts.append(int(metadata.get("word_count", 0)))
+                page_numbers.append(str(metadata.get("page_number", 0)))
+                page_ranges.append(str(metadata.get("page_range", "")))
+                embedding_timestamps.append(str(metadata.get("embedding_timestamp", "")))
+                if fill_vectors:
+                    vectors[i] = emb.get("embedding", [])
+
+            entities = [
+                contents,
+                [document_name] * num_entities,
+                chunk_ids,
+                total_chunks,
+                word_counts,
+                page_numbers,
+                page_ranges,
+                [embedding_provider] * num_entities,
+                [embedding_model] * num_entities,
+                embedding_timestamps,
+                vectors
+            ]
             
             logger.info(f"Creating Milvus collection: {collection_name}")
             
@@ -291,41 +447,129 @@ class VectorStoreService:
                 )
                 field_schemas.append(field_schema)
 
-            schema = CollectionSchema(fields=field_schemas, description=f"Collection for {collection_name}")
+            # 在描述中记录嵌入文件摘要，供 skip_if_exists 判断是否为同一份数据
+            schema = CollectionSchema(
+                fields=field_schemas,
+                description=f"Collection for {collection_name}; source_digest={source_digest}"
+            )
             collection = Collection(name=collection_name, schema=schema)
             
-            # 插入数据
-            logger.info(f"Inserting {len(entities)} vectors")
-            insert_result = collection.insert(entities)
-            collection.flush()
-            # 创建索引
+            # 插入数据：大批量数据走 bulk insert，由 Milvus 直接导入 Parquet 文件
+            if self._should_bulk_insert(num_entities):
+                logger.info(f"Bulk inserting {num_entities} vectors")
+                index_size = self._bulk_insert_to_milvus(collection_name, schema, entities)
+            else:
+                logger.info(f"Inserting {num_entities} vectors")
+                insert_result = collection.insert(entities)
+                collection.flush()
+                index_size = len(insert_result.primary_keys)
+            # 全部数据写入并 flush 一次后再建索引，索引只在封存后的完整 segment 上构建一次
+            # auto 模式按数据量选择索引；手动指定内存索引但原始向量超出 Milvus 内存预算一半时改用 DISKANN，避免内存索引被换页
+            index_mode = config.index_mode
+            if index_mode == "auto":
+                index_mode = select_index(index_size, vector_dim)
+                logger.info(f"Auto-selected {index_mode} index for {index_size} x {vector_dim} vectors")
+            elif index_mode != "diskann" and prefers_disk_index(index_size, vector_dim):
+                logger.warning(f"{index_size} x {vector_dim} vectors exceed the Milvus memory budget, using DISKANN instead of {index_mode}")
+                index_mode = "diskann"
             index_params = {
-                "metric_type": "COSINE",
-                "index_type": self._get_milvus_index_type(config),
-                "params": self._get_milvus_index_params(config)
+                "metric_type": MILVUS_CONFIG["metric_type"],
+                "index_type": config._get_milvus_index_type(index_mode),
+                "params": config._get_milvus_index_params(index_mode, index_size)
             }
             collection.create_index(field_name="vector", index_params=index_params)
             collection.load()
             
             return {
-                "index_size": len(insert_result.primary_keys),
-                "collection_name": collection_name
+                "index_size": index_size,
+                "collection_name": collection_name,
+                "index_mode": index_mode
             }
             
         except Exception as e:
             logger.error(f"Error indexing to Milvus: {str(e)}")
             raise
+            
+    def _find_existing_milvus_collections(self, prefix: str) -> List[str]:
+        """返回名称为 prefix + 时间戳 的已有集合"""
+        from pymilvus import utility
+        return [
+            name for name in utility.list_collections()
+            if name.startswith(prefix) and name[len(prefix):].isdigit()
+        ]
+
+    def _should_bulk_insert(self, num_entities: int) -> bool:
+        """数据量超过阈值且配置了对象存储时使用 bulk insert"""
+        return bool(MILVUS_BULK_INSERT_CONFIG["bucket_name"]) and num_entities > MILVUS_BULK_INSERT_CONFIG["threshold"]
+
+    def _bulk_insert_to_milvus(self, collection_name: str, schema: "CollectionSchema", columns: list) -> int:
+        """
+        通过 RemoteBulkWriter 把列数据写成 Parquet 上传到 MinIO/S3，再调用 do_bulk_insert 导入
         
-        finally:
-            connections.disconnect("default")
+        参数:
+            collection_name: 目标集合名称
+            schema: 集合 schema
+            columns: 按 schema 字段顺序（不含自增主键）排列的列数据
             
-    def _index_to_chroma(self, embeddings_data: Dict[str, Any], config: VectorDBConfig) -> Dict[str, Any]:
+        返回:
+            导入的行数
+        """
+        from pymilvus.bulk_writer import RemoteBulkWriter, BulkFileType
+        from pymilvus import BulkInsertState, utility
+
+        bulk_config = MILVUS_BULK_INSERT_CONFIG
+        connect_param = RemoteBulkWriter.S3ConnectParam(
+            endpoint=bulk_config["endpoint"],
+            access_key=bulk_config["access_key"],
+            secret_key=bulk_config["secret_key"],
+            bucket_name=bulk_config["bucket_name"],
+            secure=bulk_config["secure"]
+        )
+        field_names = [field.name for field in schema.fields if not field.auto_id]
+
+        with RemoteBulkWriter(
+            schema=schema,
+            remote_path=f"{bulk_config['remote_path']}/{collection_name}",
+            connect_param=connect_param,
+            file_type=BulkFileType.PARQUET
+        ) as writer:
+            # RemoteBulkWriter 只提供逐行的 append_row 接口，这里每行仍需构造一个 dict，
+            # 该路径的吞吐受限于逐行的 Python 开销；其收益在于服务端直接导入文件，绕过 insert 的 WAL 写入
+            for row in zip(*columns):
+                writer.append_row(dict(zip(field_names, row)))
+            writer.commit()
+            batch_files = writer.batch_files
+
+        task_ids = [utility.do_bulk_insert(collection_name=collection_name, files=files) for files in batch_files]
+
+        # 轮询导入任务状态，直到全部完成或失败
+        row_count = 0
+        deadline = time.time() + bulk_config["timeout"]
+        pending = set(task_ids)
+        while pending:
+            for task_id in list(pending):
+                state = utility.get_bulk_insert_state(task_id=task_id)
+                if state.state == BulkInsertState.ImportFailed:
+                    raise RuntimeError(f"Bulk insert task {task_id} failed: {state.failed_reason}")
+                if state.state == BulkInsertState.ImportCompleted:
+                    row_count += state.row_count
+                    pending.discard(task_id)
+            if pending:
+                if time.time() > deadline:
+                    raise TimeoutError(f"Bulk insert tasks {sorted(pending)} did not finish in {bulk_config['timeout']} seconds")
+                time.sleep(bulk_config["poll_interval"])
+
+        logger.info(f"Bulk inserted {row_count} rows into {collection_name}")
+        return row_count
+
+    def _index_to_chroma(self, embeddings_data: Dict[str, Any], config: VectorDBConfig, persist_now: bool = True) -> Dict[str, Any]:
         """
         将嵌入向量索引到Chroma数据库
         
         参数:
             embeddings_data: 嵌入向量数据
             config: 向量数据库配置对象
+            persist_now: 写入后是否立即持久化
             
         返回:
             索引结果信息字典
@@ -333,38 +577,7 @@ class VectorStoreService:
         try:
             
             # 使用 filename 作为 collection 名称前缀
-            filename = embeddings_data.get("filename", "")
-            # 如果有 .pdf 后缀，移除它
-            base_name = filename.replace('.pdf', '') if filename else "doc"
-            
-            # Convert Chinese characters to pinyin
-            base_name = ''.join(lazy_pinyin(base_name, style=Style.NORMAL))
-            
-            # Replace hyphens with underscores in the base name
-            base_name = base_name.replace('-', '_')
-            
-            # Ensure the collection name starts with a letter or number (Chroma requirement)
-            # and only contains alphanumeric, underscores, or hyphens
-            if not base_name[0].isalnum():
-                # If first character is not alphanumeric, add a letter prefix
-                base_name = f"doc_{base_name}"
-            
-            # Remove any invalid characters for Chroma
-            base_name = ''.join(c for c in base_name if c.isalnum() or c in ['_', '-'])
-            
-            # Truncate if necessary (Chroma requires 3-63 characters)
-            if len(base_name) < 3:
-                base_name = f"{base_name}___"[:63]
-            elif len(base_name) > 63:
-                base_name = base_name[:63]
-            
-            # Ensure it doesn't end with non-alphanumeric
-            while base_name and not base_name[-1].isalnum():
-                base_name = base_name[:-1]
-            
-            # Ensure it doesn't start with non-alphanumeric (should already be handled)
-            while base_name and not base_name[0].isalnum():
-                base_name = base_name[1:]
+            base_name = _sanitize_collection_name(embeddings_data.get("filename", ""))
             
             # Get embedding provider
             embedding_provider = embeddings_data.get("embedding_provider", "unknown")
@@ -391,6 +604,8 @@ class VectorStoreService:
                 }
                 
                 documents.append(content)
+                # chromadb 0.5.x 的 validate_embeddings 只接受 list[list[float]]，传入 ndarray 会被拒绝；
+                # 这里直接引用 orjson 解析出的列表，不做复制或类型转换
                 embeddings.append(emb.get("embedding", []))
                 metadatas.append(metadata)
             
@@ -408,22 +623,32 @@ class VectorStoreService:
             embedding_function = DummyEmbeddingFunction(vector_dim)
             
             # 使用预先计算好的embeddings创建Chroma实例
+            from langchain_community.vectorstores import Chroma
+
             chroma_db = Chroma(
                 collection_name=collection_name,
+                client=get_chroma_client(config.chroma_persist_dir),
                 persist_directory=config.chroma_persist_dir,
                 embedding_function=embedding_function  # 添加嵌入函数
             )
             
-            # 向Chroma添加文档和向量
+            # 向Chroma添加文档和向量：直接调用底层 collection.add 批量写入，
+            # 使用确定性的 id，每批不超过客户端允许的最大批量
             logger.info(f"Inserting {len(embeddings)} vectors into Chroma")
-            chroma_db.add_texts(
-                texts=documents,
-                embeddings=embeddings,
-                metadatas=metadatas
-            )
+            ids = [f"{collection_name}-{i}" for i in range(len(embeddings))]
+            batch_size = min(CHROMA_MAX_BATCH_SIZE, chroma_db._client.get_max_batch_size())
+            for start in range(0, len(embeddings), batch_size):
+                end = start + batch_size
+                chroma_db._collection.add(
+                    ids=ids[start:end],
+                    embeddings=embeddings[start:end],
+                    documents=documents[start:end],
+                    metadatas=metadatas[start:end]
+                )
             
-            # 持久化到磁盘
-            chroma_db.persist()
+            # 持久化到磁盘（chromadb >= 0.4 写入时已自动持久化，此调用仅对旧版本生效）
+            if persist_now:
+                chroma_db.persist()
             
             return {
                 "index_size": len(embeddings),
@@ -444,21 +669,17 @@ class VectorStoreService:
         返回:
             集合名称列表
         """
-        if provider == VectorDBProvider.MILVUS:
-            try:
-                connections.connect(alias="default", uri=MILVUS_CONFIG["uri"])
-                collections = utility.list_collections()
-                return collections
-            finally:
-                connections.disconnect("default")
-        elif provider == VectorDBProvider.CHROMA:
+        if provider == MILVUS:
+            from pymilvus import utility
+            get_client(MILVUS)
+            return utility.list_collections()
+        elif provider == CHROMA:
             try:
                 # 确保Chroma持久化目录存在
-                chroma_persist_dir = "03-vector-store/chroma"
+                chroma_persist_dir = PROVIDER_CONFIGS[CHROMA]["settings"]["persist_directory"]
                 if os.path.exists(chroma_persist_dir):
                     # 使用Chroma客户端列出集合
-                    from chromadb import PersistentClient
-                    client = PersistentClient(path=chroma_persist_dir)
+                    client = get_chroma_client(chroma_persist_dir)
                     collections = [col.name for col in client.list_collections()]
                     return collections
                 return []
@@ -478,21 +699,19 @@ class VectorStoreService:
         返回:
             是否删除成功
         """
-        if provider == VectorDBProvider.MILVUS:
-            try:
-                connections.connect(alias="default", uri=MILVUS_CONFIG["uri"])
-                utility.drop_collection(collection_name)
-                return True
-            finally:
-                connections.disconnect("default")
-        elif provider == VectorDBProvider.CHROMA:
+        if provider == MILVUS:
+            from pymilvus import utility
+            get_client(MILVUS)
+            utility.drop_collection(collection_name)
+            invalidate_milvus_collections()
+            return True
+        elif provider == CHROMA:
             try:
                 # 确保Chroma持久化目录存在
-                chroma_persist_dir = "03-vector-store/chroma"
+                chroma_persist_dir = PROVIDER_CONFIGS[CHROMA]["settings"]["persist_directory"]
                 if os.path.exists(chroma_persist_dir):
                     # 使用Chroma客户端删除集合
-                    from chromadb import PersistentClient
-                    client = PersistentClient(path=chroma_persist_dir)
+                    client = get_chroma_client(chroma_persist_dir)
                     client.delete_collection(collection_name)
                     return True
                 return False
@@ -512,25 +731,21 @@ class VectorStoreService:
         返回:
             集合信息字典
         """
-        if provider == VectorDBProvider.MILVUS:
-            try:
-                connections.connect(alias="default", uri=MILVUS_CONFIG["uri"])
-                collection = Collection(collection_name)
-                return {
-                    "name": collection_name,
-                    "num_entities": collection.num_entities,
-                    "schema": collection.schema.to_dict()
-                }
-            finally:
-                connections.disconnect("default")
-        elif provider == VectorDBProvider.CHROMA:
+        if provider == MILVUS:
+            get_client(MILVUS)
+            collection = get_milvus_collection(collection_name)
+            return {
+                "name": collection_name,
+                "num_entities": collection.num_entities,
+                "schema": collection.schema.to_dict()
+            }
+        elif provider == CHROMA:
             try:
                 # 确保Chroma持久化目录存在
-                chroma_persist_dir = "03-vector-store/chroma"
+                chroma_persist_dir = PROVIDER_CONFIGS[CHROMA]["settings"]["persist_directory"]
                 if os.path.exists(chroma_persist_dir):
                     # 使用Chroma客户端获取集合信息
-                    from chromadb import PersistentClient
-                    client = PersistentClient(path=chroma_persist_dir)
+                    client = get_chroma_client(chroma_persist_dir)
                     
                     # 获取集合
                     collection = client.get_collection(collection_name)
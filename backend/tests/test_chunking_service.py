@@ -0,0 +1,41 @@
+import pytest
+
+from services import chunking_service
+from services.chunking_service import ChunkingService
+
+
+class CharEncoding:
+    """每个字符对应一个 token 的编码器，避免测试依赖 tiktoken 词表下载"""
+
+    def encode_ordinary(self, text):
+        return [ord(ch) for ch in text]
+
+    def encode_ordinary_batch(self, texts):
+        return [self.encode_ordinary(text) for text in texts]
+
+    def decode(self, tokens):
+        return "".join(chr(token) for token in tokens)
+
+
+@pytest.fixture(autouse=True)
+def char_encoding(monkeypatch):
+    monkeypatch.setattr(chunking_service, "_get_encoding", lambda name: CharEncoding())
+
+
+def _token_chunks(pages, chunk_size, chunk_overlap):
+    page_map = [{"text": text, "page": page} for page, text in pages]
+    result = ChunkingService().chunk_text("", "token", {"filename": "doc"}, page_map, chunk_size, chunk_overlap)
+    return [(chunk["content"], chunk["metadata"]["page_range"]) for chunk in result["chunks"]]
+
+
+def test_token_chunk_starting_on_page_separator_is_attributed_to_its_text():
+    # 第二个窗口 [3, 9) 以第 1 页后的换行开头、跨过空白的第 2 页，文本只来自第 3 页
+    chunks = _token_chunks([(1, "aaa"), (2, ""), (3, "bbb")], chunk_size=6, chunk_overlap=3)
+    assert chunks == [("aaa\n\nb", "1-3"), ("bbb", "3")]
+
+
+def test_token_chunk_spanning_short_pages_reports_first_and_last_text_page():
+    chunks = _token_chunks([(1, "ab"), (2, "c"), (3, "de")], chunk_size=6, chunk_overlap=2)
+    assert chunks[0] == ("ab\nc\nd", "1-3")
+    # 第二个窗口以第 2 页后的换行开头，实际文本只来自第 3 页
+    assert chunks[1] == ("de", "3")
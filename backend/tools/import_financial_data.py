@@ -1,11 +1,15 @@
 from pymilvus import model
 from pymilvus import MilvusClient, DataType, FieldSchema, CollectionSchema
 import pandas as pd
+import numpy as np
+import json
 from tqdm import tqdm
 import logging
 from dotenv import load_dotenv
 import torch
 import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 load_dotenv()
 
@@ -13,8 +17,9 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # 初始化 OpenAI 嵌入函数 (这里使用 BGE-M3)
+EMBEDDING_MODEL_NAME = 'BAAI/bge-m3'
 embedding_function = model.dense.SentenceTransformerEmbeddingFunction(
-            model_name='BAAI/bge-m3',
+            model_name=EMBEDDING_MODEL_NAME,
             device='cuda:0' if torch.cuda.is_available() else 'cpu',
             trust_remote_code=True
         )
@@ -69,6 +74,18 @@ schema = CollectionSchema(fields,
                           "Financial Terms Collection", 
                           enable_dynamic_field=True)
 
+# 索引类型：默认 IVF_SQ8，向量按 8 bit 标量量化，内存约为 FP32 的 1/4，万级术语下召回损失可忽略；
+# 可通过 FINANCIAL_INDEX_TYPE 改为 HNSW 或 FLAT（十万条以内暴力检索也足够快）。
+# 在创建集合之前校验，避免取值错误时留下一个没有索引的空集合
+index_presets = {
+    "IVF_SQ8": {"nlist": 128},
+    "HNSW": {"M": 16, "efConstruction": 200},
+    "FLAT": {},
+}
+index_type = os.getenv("FINANCIAL_INDEX_TYPE", "IVF_SQ8").upper()
+if index_type not in index_presets:
+    raise ValueError(f"Unsupported FINANCIAL_INDEX_TYPE: {index_type}")
+
 # 如果集合不存在，创建集合
 if not client.has_collection(collection_name):
     client.create_collection(
@@ -81,9 +98,9 @@ if not client.has_collection(collection_name):
     index_params = client.prepare_index_params()
     index_params.add_index(
         field_name="vector",  # 指定要为哪个字段创建索引，这里是向量字段
-        index_type="AUTOINDEX",  # 使用自动索引类型
-        metric_type="COSINE",  # 使用余弦相似度
-        params={} 
+        index_type=index_type,
+        metric_type="IP",  # 向量在插入前已归一化，内积即余弦相似度
+        params=index_presets[index_type]
     )
 
     client.create_index(
@@ -93,41 +110,122 @@ if not client.has_collection(collection_name):
 else:
     logging.info(f"Collection {collection_name} already exists. Appending data...")
 
-# 批量处理
-batch_size = 1000
-
-for start_idx in tqdm(range(0, len(df), batch_size), desc="Processing batches"):
-    end_idx = min(start_idx + batch_size, len(df))
-    batch_df = df.iloc[start_idx:end_idx]
-
-    # 准备文档 - 只需要 term 即可
-    docs = batch_df['term'].tolist()
-
-    # 生成嵌入
-    try:
-        embeddings = embedding_function(docs)
-    except Exception as e:
-        logging.error(f"Error generating embeddings for batch {start_idx // batch_size + 1}: {e}")
-        continue
-
-    # 准备数据
-    data = []
-    for idx, (_, row) in enumerate(batch_df.iterrows()):
-        data.append({
-            "vector": embeddings[idx],
-            "term": str(row['term']),
-            "category": str(row['category'])
-        })
-
-    # 插入数据
+# 第一阶段：预先计算整个 CSV 的嵌入
+# 以 EMBED_BATCH_SIZE 条为一个微批次送入模型，归一化后以 FP16 写入磁盘上的 memmap；
+# 进度记录在同名 .json 文件中，中途失败后重新运行会从上次完成的位置继续；
+# 该文件同时记录术语内容摘要和模型名称，CSV 内容或模型变化后缓存作废并重新计算
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+embedding_cache_path = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(data_dir, "financial_terms_embeddings.f16"))
+embedding_meta_path = embedding_cache_path + ".json"
+all_terms = df['term'].tolist()
+num_rows = len(all_terms)
+terms_digest = hashlib.blake2b("\x1f".join(all_terms).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def save_embedding_progress(done):
+    embeddings_mm.flush()
+    with open(embedding_meta_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "rows": num_rows,
+            "dim": vector_dim,
+            "model": EMBEDDING_MODEL_NAME,
+            "terms_digest": terms_digest,
+            "done": done
+        }, f)
+
+
+embedded_rows = 0
+if os.path.exists(embedding_cache_path) and os.path.exists(embedding_meta_path):
+    with open(embedding_meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if (meta.get("rows") == num_rows and meta.get("dim") == vector_dim
+            and meta.get("model") == EMBEDDING_MODEL_NAME and meta.get("terms_digest") == terms_digest):
+        embedded_rows = int(meta.get("done", 0))
+    else:
+        logging.info("Embedding cache does not match the current CSV or model, recomputing")
+
+if num_rows == 0:
+    embeddings_mm = np.zeros((0, vector_dim), dtype=np.float16)
+elif embedded_rows > 0:
+    logging.info(f"Resuming embedding from row {embedded_rows}/{num_rows}")
+    embeddings_mm = np.memmap(embedding_cache_path, dtype=np.float16, mode="r+", shape=(num_rows, vector_dim))
+else:
+    embeddings_mm = np.memmap(embedding_cache_path, dtype=np.float16, mode="w+", shape=(num_rows, vector_dim))
+
+with torch.inference_mode():
+    for batch_no, start_idx in enumerate(tqdm(range(embedded_rows, num_rows, EMBED_BATCH_SIZE), desc="Embedding terms"), 1):
+        end_idx = min(start_idx + EMBED_BATCH_SIZE, num_rows)
+        try:
+            embeddings = np.asarray(embedding_function(all_terms[start_idx:end_idx]), dtype=np.float32)
+        except Exception as e:
+            save_embedding_progress(start_idx)
+            logging.error(f"Error generating embeddings for rows {start_idx}-{end_idx}: {e}")
+            raise
+        # 显式归一化，保证 IP 度量与余弦相似度一致
+        embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        embeddings_mm[start_idx:end_idx] = embeddings
+        if batch_no % 16 == 0:
+            save_embedding_progress(end_idx)
+
+if num_rows:
+    save_embedding_progress(num_rows)
+
+# 第二阶段：批量插入
+# 单次 insert 的 gRPC 消息需低于服务端接收上限（默认 64MB），这里按 60MB 估算：
+# 每行约为 vector_dim * 4 字节的 float32 向量，加上 term/category 等字段约 640 字节
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "256"))
+max_rows_per_rpc = 60_000_000 // (vector_dim * 4 + 640)
+batch_size = max(1, min(BATCH_SIZE, max_rows_per_rpc))
+logging.info(f"Batch size: {batch_size} (requested {BATCH_SIZE}, per-RPC limit {max_rows_per_rpc})")
+# flush 会封存 segment 并同步等待落盘，默认只在导入结束后执行一次；
+# 设置 FLUSH_EVERY=K 时每 K 个批次额外 flush 一次，便于中途崩溃后保留已导入的数据
+flush_every = int(os.getenv("FLUSH_EVERY", "0"))
+# 并发插入的线程数，以及允许排队等待插入的批次上限（限制内存中积压的嵌入）
+max_concurrency = int(os.getenv("MAX_CONCURRENCY", "4"))
+max_pending = int(os.getenv("MAX_PENDING_BATCHES", str(max_concurrency * 2)))
+
+
+def insert_batch(batch_no, data):
+    """在线程池中执行的插入任务，gRPC 调用期间释放 GIL，多个插入请求并发进行"""
     try:
         res = client.insert(
             collection_name=collection_name,
             data=data
         )
-        client.flush(collection_name)
-        # logging.info(f"Inserted batch {start_idx // batch_size + 1}, result: {res}")
+        # logging.info(f"Inserted batch {batch_no}, result: {res}")
     except Exception as e:
-        logging.error(f"Error inserting batch {start_idx // batch_size + 1}: {e}")
+        logging.error(f"Error inserting batch {batch_no}: {e}")
+
+
+pending = set()
+with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+    for start_idx in tqdm(range(0, len(df), batch_size), desc="Processing batches"):
+        end_idx = min(start_idx + batch_size, len(df))
+        batch_df = df.iloc[start_idx:end_idx]
+        batch_no = start_idx // batch_size + 1
+
+        # 从预先计算好的 memmap 中读取该批次的嵌入
+        embeddings = embeddings_mm[start_idx:end_idx].astype(np.float32)
+
+        # 准备数据：按列取出字段后一次 zip 组装行，不再逐行构造 Series
+        terms = batch_df['term'].astype(str).to_numpy().tolist()
+        categories = batch_df['category'].astype(str).to_numpy().tolist()
+        data = [
+            {"vector": vector, "term": term, "category": category}
+            for vector, term, category in zip(embeddings, terms, categories)
+        ]
+
+        # 提交插入任务；积压的批次达到上限时先等待其中一个完成
+        if len(pending) >= max_pending:
+            _, pending = wait(pending, return_when=FIRST_COMPLETED)
+        pending.add(executor.submit(insert_batch, batch_no, data))
+
+        if flush_every > 0 and batch_no % flush_every == 0:
+            wait(pending)
+            pending.clear()
+            client.flush(collection_name)
+
+    wait(pending)
 
+client.flush(collection_name)
 logging.info("Insert process completed.")
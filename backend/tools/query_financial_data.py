@@ -3,55 +3,127 @@ from dotenv import load_dotenv
 import logging
 import torch
 import os
+import sys
+from functools import lru_cache
+from typing import List, Dict
+
+# 脚本在 backend/tools 下独立运行，把 backend 加入模块搜索路径以复用 utils 中的查询参数配置
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.config import build_search_params
 
 load_dotenv()
 
 # 设置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+@lru_cache(maxsize=1)
+def get_embedding_function():
+    """
+    加载一次 BGE-M3 嵌入函数并在多次查询间复用
+    
+    在 CUDA 上直接以 FP16 加载权重（不先加载 FP32 再转换），并允许 matmul 使用 TF32
+    """
+    logging.info("Initializing embedding model...")
+    extra_kwargs = {}
+    if torch.cuda.is_available():
+        device = 'cuda:0'
+        extra_kwargs["model_kwargs"] = {"torch_dtype": torch.float16}
+        torch.backends.cuda.matmul.allow_tf32 = True
+        torch.backends.cudnn.allow_tf32 = True
+    else:
+        device = 'cpu'
+    return model.dense.SentenceTransformerEmbeddingFunction(
+        model_name='BAAI/bge-m3',
+        device=device,
+        trust_remote_code=True,
+        **extra_kwargs
+    )
+
+
+@lru_cache(maxsize=4)
+def get_client(uri: str = "http://localhost:19530") -> MilvusClient:
+    """按 uri 缓存 MilvusClient，复用同一个 gRPC 连接"""
+    logging.info("Connecting to Milvus...")
+    return MilvusClient(uri=uri)
+
+
+@lru_cache(maxsize=8)
+def get_index_info(collection_name: str) -> Dict:
+    """读取向量字段的索引类型与度量方式"""
+    client = get_client()
+    for index_name in client.list_indexes(collection_name, field_name="vector"):
+        return client.describe_index(collection_name, index_name) or {}
+    return {}
+
+
+def get_search_params(collection_name: str, limit: int) -> Dict:
+    """
+    按集合实际的索引类型构造搜索参数，与后端服务共用 MILVUS_CONFIG["search_params"]
+    （nprobe / ef 分别由 MILVUS_IVF_NPROBE / MILVUS_HNSW_EF 调整）
+    """
+    return build_search_params(get_index_info(collection_name), limit, default_metric="IP")
+
+
+def query_financial_terms_batch(queries: List[str], limit: int = 5) -> List[List[Dict]]:
+    """
+    批量查询金融术语
+    
+    所有查询一次编码，并通过一次多向量 search 请求检索，返回与 queries 一一对应的结果
+    """
+    if not queries:
+        return []
+
+    # 1. 获取 Embedding 函数 (BGE-M3)，首次调用时加载
+    embedding_function = get_embedding_function()
+
+    # 2. 连接到 Milvus
+    client = get_client()
+    collection_name = "financial_terms"
+
+    if not client.has_collection(collection_name):
+        logging.error(f"Collection {collection_name} does not exist. Please run import_financial_data.py first.")
+        return [[] for _ in queries]
+
+    # 3. 生成查询向量
+    logging.info(f"Generating embeddings for {len(queries)} queries")
+    with torch.inference_mode():
+        query_embeddings = embedding_function(queries)
+
+    # 4. 执行搜索
+    logging.info("Searching in Milvus...")
+    search_result = client.search(
+        collection_name=collection_name,
+        data=[embedding.tolist() for embedding in query_embeddings],
+        limit=limit,
+        output_fields=["term", "category"],
+        search_params=get_search_params(collection_name, limit)
+    )
+
+    return [
+        [
+            {
+                "term": hit['entity'].get('term'),
+                "category": hit['entity'].get('category'),
+                "score": hit['distance']
+            }
+            for hit in hits
+        ]
+        for hits in search_result
+    ]
+
+
 def query_financial_terms(query_text: str, limit: int = 5):
     """
     查询金融术语
     """
     try:
-        # 1. 初始化 Embedding 函数 (BGE-M3)
-        logging.info("Initializing embedding model...")
-        embedding_function = model.dense.SentenceTransformerEmbeddingFunction(
-            model_name='BAAI/bge-m3',
-            device='cuda:0' if torch.cuda.is_available() else 'cpu',
-            trust_remote_code=True
-        )
-
-        # 2. 连接到 Milvus
-        logging.info("Connecting to Milvus...")
-        client = MilvusClient(uri="http://localhost:19530")
-        collection_name = "financial_terms"
-
-        if not client.has_collection(collection_name):
-            logging.error(f"Collection {collection_name} does not exist. Please run import_financial_data.py first.")
-            return
-
-        # 3. 生成查询向量
-        logging.info(f"Generating embedding for query: '{query_text}'")
-        query_embeddings = embedding_function([query_text])
-
-        # 4. 执行搜索
-        logging.info("Searching in Milvus...")
-        search_result = client.search(
-            collection_name=collection_name,
-            data=[query_embeddings[0].tolist()],
-            limit=limit,
-            output_fields=["term", "category"]
-        )
-
-        # 5. 打印结果
+        results = query_financial_terms_batch([query_text], limit=limit)[0]
+
+        # 打印结果
         logging.info(f"Search results for '{query_text}':")
-        for hits in search_result:
-            for hit in hits:
-                term = hit['entity'].get('term')
-                category = hit['entity'].get('category')
-                distance = hit['distance']
-                print(f"- Term: {term}, Category: {category}, Score: {distance:.4f}")
+        for result in results:
+            print(f"- Term: {result['term']}, Category: {result['category']}, Score: {result['score']:.4f}")
+        return results
 
     except Exception as e:
         logging.error(f"An error occurred: {e}")
@@ -60,7 +132,13 @@ if __name__ == "__main__":
     # 示例查询
     import argparse
     parser = argparse.ArgumentParser(description="Query financial terms in Milvus.")
-    parser.add_argument("query", type=str, nargs="?", default="ABA", help="The query text to search for.")
+    parser.add_argument("query", type=str, nargs="*", default=["ABA"], help="The query texts to search for.")
     args = parser.parse_args()
 
-    query_financial_terms(args.query)
+    if len(args.query) == 1:
+        query_financial_terms(args.query[0])
+    else:
+        for query_text, results in zip(args.query, query_financial_terms_batch(args.query)):
+            logging.info(f"Search results for '{query_text}':")
+            for result in results:
+                print(f"- Term: {result['term']}, Category: {result['category']}, Score: {result['score']:.4f}")
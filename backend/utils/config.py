@@ -1,18 +1,47 @@
+import os
+import json
+import hashlib
 from enum import Enum
+from types import MappingProxyType
 from typing import Dict, Any
 
 class VectorDBProvider(str, Enum):
     MILVUS = "milvus"
     CHROMA = "chroma"
 
+# 枚举成员的模块级别名：按请求分发提供商时直接取模块属性，不经过 EnumMeta 的属性查找
+MILVUS = VectorDBProvider.MILVUS
+CHROMA = VectorDBProvider.CHROMA
+
+def _freeze(value):
+    """递归地把 dict 转为只读的 MappingProxyType，防止配置在运行时被意外修改"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    return value
+
+
 # Milvus 配置（保持您原有的）
-MILVUS_CONFIG = {
+# 配置为只读映射：需要调整参数时请先复制，如 dict(MILVUS_CONFIG["index_params"]["hnsw"], efConstruction=200)
+MILVUS_CONFIG = _freeze({
     "uri": "tcp://10.250.221.18:19530",
+    # 传给 connections.connect 的连接参数：timeout 为等待连接就绪的秒数，
+    # keep_alive 开启 gRPC keepalive，长时间空闲的连接不会被中间网络设备静默断开
+    "connection": {
+        "timeout": float(os.getenv("MILVUS_CONNECT_TIMEOUT", "10")),
+        "keep_alive": True
+    },
+    # 建索引时使用的度量方式，可选 COSINE | L2 | IP，由环境变量 MILVUS_METRIC_TYPE 指定；
+    # BGE-M3 等模型输出的是归一化向量，默认使用余弦相似度，更换嵌入模型时无需改代码
+    "metric_type": os.getenv("MILVUS_METRIC_TYPE", "COSINE").strip().upper(),
     "index_types": {
         "flat": "FLAT",
         "ivf_flat": "IVF_FLAT",
         "ivf_sq8": "IVF_SQ8",
-        "hnsw": "HNSW"
+        "hnsw": "HNSW",
+        # 标量量化（SQ8）的 HNSW，向量存储约为 FP32 的 1/4，需要 Milvus 2.6.8 及以上版本
+        "hnsw_sq": "HNSW_SQ",
+        # 基于磁盘的 Vamana 图索引，适合超出内存的大规模集合；需在 Milvus 中启用磁盘索引（queryNode.enableDisk）
+        "diskann": "DISKANN"
     },
     "index_params": {
         "flat": {},
@@ -21,37 +50,198 @@ MILVUS_CONFIG = {
         "hnsw": {
             "M": 16,
             "efConstruction": 500
-        }
+        },
+        "hnsw_sq": {
+            "M": 16,
+            "efConstruction": 200,
+            "sq_type": "SQ8"
+        },
+        # DISKANN 建索引无需参数，查询时通过 search_list 控制候选集大小
+        "diskann": {}
+    },
+    # 查询时参数，按索引模式区分；HNSW 的 ef 与 IVF 的 nprobe 可用环境变量覆盖
+    "search_params": {
+        "flat": {},
+        "ivf_flat": {"nprobe": int(os.getenv("MILVUS_IVF_NPROBE", "16"))},
+        "ivf_sq8": {"nprobe": int(os.getenv("MILVUS_IVF_NPROBE", "16"))},
+        "hnsw": {"ef": int(os.getenv("MILVUS_HNSW_EF", "64"))},
+        "hnsw_sq": {"ef": int(os.getenv("MILVUS_HNSW_EF", "64"))},
+        "diskann": {"search_list": int(os.getenv("MILVUS_DISKANN_SEARCH_LIST", "100"))}
+    },
+    # 命名的查询档位：只覆盖当前索引已有的查询参数，同一索引无需重建即可在延迟与召回之间切换；
+    # latency 用于面向用户的检索，recall 用于离线评估等批处理任务
+    "search_profiles": {
+        "latency": {"ef": 40, "nprobe": 8, "search_list": 40},
+        "balanced": {"ef": 100, "nprobe": 16, "search_list": 100},
+        "recall": {"ef": 400, "nprobe": 64, "search_list": 400}
     }
+})
+
+# MILVUS_CONFIG 的稳定摘要（含环境变量覆盖后的取值），作为客户端缓存 Collection 句柄等对象的键，
+# 配置变化后旧缓存自然失效
+CONFIG_HASH = hashlib.blake2b(
+    json.dumps(MILVUS_CONFIG, sort_keys=True, default=dict).encode("utf-8")
+).hexdigest()[:16]
+
+MILVUS_METRIC_TYPES = ("COSINE", "L2", "IP")
+if MILVUS_CONFIG["metric_type"] not in MILVUS_METRIC_TYPES:
+    raise ValueError(f"Unsupported MILVUS_METRIC_TYPE: {MILVUS_CONFIG['metric_type']}, expected one of {MILVUS_METRIC_TYPES}")
+
+def resolve_index_mode(index_mode: str) -> str:
+    """
+    确定建索引时实际使用的索引模式
+    
+    设置了环境变量 MILVUS_INDEX_TYPE（如 HNSW_SQ）时，以其对应的模式覆盖请求中的 index_mode，
+    便于在整个部署上统一切换索引类型；未设置或取值未知时保持原值
+    """
+    index_type = os.getenv("MILVUS_INDEX_TYPE", "").strip().upper()
+    for mode, name in MILVUS_CONFIG["index_types"].items():
+        if name == index_type:
+            return mode
+    return index_mode
+
+def build_search_params(index_info, top_k: int, profile: str = None, default_metric: str = None,
+                        vector_count: int = None) -> Dict[str, Any]:
+    """
+    按索引信息从 MILVUS_CONFIG["search_params"] 构造 search 的 param 参数
+    
+    index_info 为索引描述（含 index_type / metric_type，ORM 的 Index.params 与 MilvusClient.describe_index 均可）；
+    提供 vector_count 时 HNSW 的 ef 默认取 configure_hnsw_params 按集合规模给出的值；
+    指定 profile 时用 MILVUS_CONFIG["search_profiles"] 中的同名参数覆盖默认值；
+    HNSW 的 ef 与 DISKANN 的 search_list 不小于 top_k；索引信息缺少度量方式时使用 default_metric，
+    未提供则使用 MILVUS_CONFIG["metric_type"]
+    """
+    index_type = str(index_info.get("index_type") or "FLAT").upper()
+    index_mode = next(
+        (mode for mode, name in MILVUS_CONFIG["index_types"].items() if name == index_type),
+        None
+    )
+    params = dict(MILVUS_CONFIG["search_params"].get(index_mode, {}))
+    if "ef" in params and vector_count is not None:
+        params["ef"] = configure_hnsw_params(vector_count)["ef"]
+    if profile:
+        if profile not in MILVUS_CONFIG["search_profiles"]:
+            raise ValueError(f"Unknown search profile: {profile}")
+        overrides = MILVUS_CONFIG["search_profiles"][profile]
+        params.update({key: overrides[key] for key in params if key in overrides})
+    for key in ("ef", "search_list"):
+        if key in params:
+            params[key] = max(params[key], top_k)
+    return {
+        "metric_type": index_info.get("metric_type") or default_metric or MILVUS_CONFIG["metric_type"],
+        "params": params
+    }
+
+def configure_hnsw_params(vector_count: int) -> Dict[str, int]:
+    """
+    按集合规模选择 HNSW 参数
+    
+    小集合使用较小的 efConstruction 以缩短建索引时间，大集合提高 M / ef 以保证召回率；
+    可分别用环境变量 MILVUS_HNSW_M、MILVUS_HNSW_EF_CONSTRUCTION、MILVUS_HNSW_EF 覆盖
+    
+    返回:
+        {"M", "efConstruction", "ef"}，其中 ef 为查询时参数
+    """
+    if vector_count < 100_000:
+        params = {"M": 16, "efConstruction": 64, "ef": 40}
+    elif vector_count < 1_000_000:
+        params = {"M": 24, "efConstruction": 100, "ef": 100}
+    else:
+        params = {"M": 32, "efConstruction": 128, "ef": 200}
+    for key, env_name in (("M", "MILVUS_HNSW_M"), ("efConstruction", "MILVUS_HNSW_EF_CONSTRUCTION"), ("ef", "MILVUS_HNSW_EF")):
+        if os.getenv(env_name):
+            params[key] = int(os.getenv(env_name))
+    return params
+
+
+def milvus_memory_budget_gb():
+    """
+    Milvus 可用于索引的内存预算（GB），取自环境变量 MILVUS_MEMORY_BUDGET_GB
+    
+    Milvus 部署在远程服务器上，本机内存不能代表其容量，因此未设置时返回 None，表示预算未知
+    """
+    budget = os.getenv("MILVUS_MEMORY_BUDGET_GB")
+    return float(budget) if budget else None
+
+
+def _exceeds_memory_budget(vector_count: int, dim: int, memory_budget_gb: float = None) -> bool:
+    """FP32 原始向量（vector_count * dim * 4 字节）是否超过内存预算的一半；预算未知时返回 False"""
+    if memory_budget_gb is None:
+        memory_budget_gb = milvus_memory_budget_gb()
+    if memory_budget_gb is None:
+        return False
+    return vector_count * dim * 4 > memory_budget_gb * 1e9 * 0.5
+
+
+def select_index(vector_count: int, dim: int, ram_gb: float = None) -> str:
+    """
+    按集合规模自动选择索引模式（index_mode 为 "auto" 时使用）
+    
+    少于 1 万条时暴力检索（FLAT）最快且无需建图；FP32 原始向量超过内存预算一半时用 IVF_SQ8 压缩存储；
+    其余情况使用 HNSW。内存预算与 prefers_disk_index 一致，取自 milvus_memory_budget_gb()
+    """
+    if vector_count < 10_000:
+        return "flat"
+    if _exceeds_memory_budget(vector_count, dim, ram_gb):
+        return "ivf_sq8"
+    return "hnsw"
+
+
+def prefers_disk_index(vector_count: int, dim: int, memory_budget_gb: float = None) -> bool:
+    """
+    判断集合是否应改用 DISKANN
+    
+    FP32 原始向量超过 Milvus 可用内存的一半时返回 True；内存预算与 select_index 一致，
+    取自 milvus_memory_budget_gb()，未设置时不自动切换
+    """
+    return _exceeds_memory_budget(vector_count, dim, memory_budget_gb)
+
+
+# Milvus 批量导入（bulk insert）配置：数据量超过 threshold 时，先把实体写成 Parquet 上传到
+# Milvus 所用的 MinIO/S3 存储桶，再由 Milvus 直接导入，绕过逐条写入的 WAL 流程；
+# 未配置 MILVUS_BULK_BUCKET 时不启用
+MILVUS_BULK_INSERT_CONFIG = {
+    "threshold": int(os.getenv("MILVUS_BULK_INSERT_THRESHOLD", "100000")),
+    "endpoint": os.getenv("MILVUS_BULK_ENDPOINT", "localhost:9000"),
+    "access_key": os.getenv("MILVUS_BULK_ACCESS_KEY", "minioadmin"),
+    "secret_key": os.getenv("MILVUS_BULK_SECRET_KEY", "minioadmin"),
+    "bucket_name": os.getenv("MILVUS_BULK_BUCKET", ""),
+    "secure": os.getenv("MILVUS_BULK_SECURE", "false").lower() == "true",
+    "remote_path": os.getenv("MILVUS_BULK_REMOTE_PATH", "bulk_data"),
+    "poll_interval": 2,
+    "timeout": int(os.getenv("MILVUS_BULK_TIMEOUT", "3600"))
 }
 
-# # 新增 Chroma 配置
-# CHROMA_CONFIG = {
-#     # 运行模式选择: 'persistent' (本地持久化) 或 'http' (远程服务)
-#     "mode": "persistent", 
-    
-#     # 连接配置
-#     "settings": {
-#         "persist_directory": "./chroma_storage", # 对应 PersistentClient
-#         "host": "localhost",                     # 对应 HttpClient
-#         "port": 8000,                            # 对应 HttpClient
-#         "anonymized_telemetry": False            # 关闭匿名数据收集
-#     },
-#     "index_types": {
-#         "hnsw": "HNSW",      # Chroma 默认且核心的索引方式
-#         "cosine": "cosine",  # 余弦相似度
-#         "l2": "l2",          # 欧氏距离
-#         "ip": "ip"           # 内积
-#     },
-    
-#     # Chroma 默认使用 HNSW 索引，其参数通过 collection_metadata 传递
-#     # 常见的距离度量（Space）: 'l2', 'ip', 'cosine'
-#     "index_params": {
-#         "hnsw": {
-#             "hnsw:space": "cosine",
-#             "hnsw:construction_ef": 128,
-#             "hnsw:M": 16,
-#             "hnsw:search_ef": 100
-#         }
-#     }
-# }
+# Chroma 配置
+CHROMA_CONFIG = _freeze({
+    # 运行模式选择: 'persistent' (本地持久化) 或 'http' (远程服务)
+    "mode": "persistent",
+    
+    # 连接配置
+    "settings": {
+        "persist_directory": "03-vector-store/chroma",  # 对应 PersistentClient
+        "host": "localhost",                            # 对应 HttpClient
+        "port": 8000,                                   # 对应 HttpClient
+        "anonymized_telemetry": False                   # 关闭匿名数据收集
+    },
+    "index_types": {
+        "hnsw": "HNSW"       # Chroma 默认且核心的索引方式
+    },
+    
+    # Chroma 默认使用 HNSW 索引，其参数通过 collection_metadata 传递
+    # 常见的距离度量（Space）: 'l2', 'ip', 'cosine'
+    "index_params": {
+        "hnsw": {
+            "hnsw:space": "cosine",
+            "hnsw:construction_ef": 128,
+            "hnsw:M": 16,
+            "hnsw:search_ef": 100
+        }
+    }
+})
+
+# 按 VectorDBProvider 索引的配置表；提供商名称拼写错误在 VectorDBProvider(name) 处即报错
+PROVIDER_CONFIGS = MappingProxyType({
+    VectorDBProvider.MILVUS: MILVUS_CONFIG,
+    VectorDBProvider.CHROMA: CHROMA_CONFIG
+})
@@ -1,5 +1,9 @@
 import os
+import sys
+import glob
 import logging
+import ctypes.util
+from functools import lru_cache
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -25,4 +29,108 @@ def get_huggingface_model_path(model_name: str) -> str:
         return local_model_name
 
     logger.info(f"Using remote model: {model_name}")
-    return model_name 
\ No newline at end of file
+    return model_name 
+
+def _cuda_driver_present() -> bool:
+    """
+    Cheap check for an NVIDIA driver that does not import torch.
+
+    Returns:
+        bool: False when CUDA is certainly unusable (macOS, CUDA_VISIBLE_DEVICES hiding all devices,
+            or no driver found), True when a driver appears to be installed
+    """
+    if os.environ.get("CUDA_VISIBLE_DEVICES", None) in ("", "-1"):
+        return False
+    if sys.platform == "darwin":
+        return False
+    if sys.platform.startswith("linux"):
+        # /dev/dxg: GPU paravirtualization device under WSL2, which has no /dev/nvidia* nodes
+        return (os.path.exists("/proc/driver/nvidia/version") or os.path.exists("/dev/dxg")
+                or bool(glob.glob("/dev/nvidia[0-9]*")))
+    return ctypes.util.find_library("nvcuda") is not None
+
+
+@lru_cache(maxsize=1)
+def cuda_available() -> bool:
+    """
+    Check once per process whether CUDA is usable.
+
+    Every torch.cuda.is_available() call probes the driver again, so the result is cached here
+    and shared by all callers. Hosts without an NVIDIA driver return False without importing torch.
+
+    Returns:
+        bool: True if torch is installed and at least one CUDA device is visible
+    """
+    if not _cuda_driver_present():
+        return False
+    try:
+        import torch
+    except ImportError:
+        return False
+    return torch.cuda.is_available()
+
+
+@lru_cache(maxsize=1)
+def cuda_device_count() -> int:
+    """
+    Number of CUDA devices visible to torch (respects CUDA_VISIBLE_DEVICES), cached per process.
+
+    Returns:
+        int: The device count, 0 when CUDA is unavailable
+    """
+    if not cuda_available():
+        return 0
+    import torch
+    return torch.cuda.device_count()
+
+
+@lru_cache(maxsize=None)
+def cuda_device_name(index: int = 0) -> str:
+    """
+    Name of a CUDA device, cached per device index.
+
+    Args:
+        index: The CUDA device index
+
+    Returns:
+        str: The device name, or an empty string if the device does not exist
+    """
+    if index >= cuda_device_count():
+        return ""
+    import torch
+    return torch.cuda.get_device_name(index)
+
+
+def get_default_device() -> str:
+    """
+    Default device string for model loading.
+
+    Returns:
+        str: "cuda:0" when CUDA is available, otherwise "cpu"
+    """
+    return "cuda:0" if cuda_available() else "cpu"
+
+
+@lru_cache(maxsize=1)
+def warmup_cuda() -> bool:
+    """
+    Create the CUDA context and launch one trivial kernel, once per process.
+
+    The first CUDA call in a process pays for lazy context initialization; running this at
+    startup keeps that cost out of the first user query.
+
+    Returns:
+        bool: True if CUDA was warmed up, False when CUDA is unavailable or warm-up failed
+    """
+    if not cuda_available():
+        return False
+    import torch
+    try:
+        torch.cuda.init()
+        _ = torch.empty(1, device="cuda") + 1
+        torch.cuda.synchronize()
+    except Exception as e:
+        logger.warning(f"CUDA warm-up failed: {e}")
+        return False
+    logger.info(f"CUDA warmed up on {cuda_device_name(0)}")
+    return True
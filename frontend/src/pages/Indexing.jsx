@@ -22,7 +22,7 @@ const Indexing = () => {
       modes: ['standard', 'hybrid']
     },
     milvus: {
-      modes: ['flat', 'ivf_flat', 'ivf_sq8', 'hnsw']
+      modes: ['flat', 'ivf_flat', 'ivf_sq8', 'hnsw', 'hnsw_sq', 'diskann', 'auto']
     },
     qdrant: {
       modes: ['hnsw', 'custom']